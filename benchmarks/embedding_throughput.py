@@ -0,0 +1,68 @@
+# benchmarks/embedding_throughput.py
+#
+# Measures EmbeddingService throughput in chunks/second on CPU for several
+# micro-batch sizes, with chunks arriving from concurrent "uploads".
+#
+#   python -m benchmarks.embedding_throughput --chunks 2000 --uploads 8
+import argparse
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+
+from multimodal_mate.embedding_service import EmbeddingService
+
+WORDS = (
+    "index vector query document retrieval embedding chunk answer model page "
+    "section table figure summary report result method data value system user"
+).split()
+
+
+def synthetic_chunks(count, words_per_chunk, seed):
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(words_per_chunk)) + f" #{seed}-{i}" for i in range(count)]
+
+
+def run(model, batch_size, chunks, uploads, max_wait_ms, workers):
+    model.embed_batch_size = batch_size
+    service = EmbeddingService(model, max_batch_size=batch_size, max_wait_ms=max_wait_ms, workers=workers, cache_size=0)
+    per_upload = [chunks[i::uploads] for i in range(uploads)]
+
+    def upload(upload_chunks):
+        # Each upload sends its chunks in small groups, like a node parser would
+        for start in range(0, len(upload_chunks), 8):
+            service.embed(upload_chunks[start:start + 8])
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=uploads) as pool:
+        list(pool.map(upload, per_upload))
+    elapsed = time.perf_counter() - start
+    stats = service.stats()
+    service.close()
+    print(
+        f"batch_size={batch_size:<4} chunks/s={len(chunks) / elapsed:9.1f} "
+        f"avg_batch={stats['avg_batch_size']:6.1f} batches={stats['batches']}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--words-per-chunk", type=int, default=120)
+    parser.add_argument("--uploads", type=int, default=8, help="concurrent uploads feeding the service")
+    parser.add_argument("--batch-sizes", default="1,8,16,32,64,128")
+    parser.add_argument("--max-wait-ms", type=float, default=5)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+
+    model = HuggingFaceEmbedding(model_name="sentence-transformers/all-MiniLM-L6-v2", device="cpu")
+    model.get_text_embedding_batch(["warm up"])
+
+    for seed, batch_size in enumerate(int(size) for size in args.batch_sizes.split(",")):
+        chunks = synthetic_chunks(args.chunks, args.words_per_chunk, seed)
+        run(model, batch_size, chunks, args.uploads, args.max_wait_ms, args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+# benchmarks/load_test.py
+#
+# End-to-end load test of the FastAPI app with the local fake providers
+# (APP_PROVIDERS=fake), so it runs offline and without credentials. The app
+# is driven in-process through httpx's ASGI transport with an open-loop
+# request schedule, and each scenario reports RPS, p50/p95/p99 and the mean
+# time per request spent in each fake provider; "app" is everything else
+# (queueing, preprocessing, caches, serialization).
+#
+#   python -m benchmarks.load_test --scenario visionary --rps 20 --duration 30
+#   python -m benchmarks.load_test --scenario mixed --rps 40 --duration 60
+#   FAKE_GEMINI_FAILURE_RATE=0.05 python -m benchmarks.load_test --scenario visionary-stream
+#
+# Provider behaviour is set with FAKE_<PROVIDER>_LATENCY_MS, _JITTER_MS and
+# _FAILURE_RATE for GEMINI, TTS, PERPLEXITY, LLM and EMBED.
+import argparse
+import asyncio
+import io
+import os
+import random
+import statistics
+import tempfile
+import time
+
+SCENARIOS = ["visionary", "visionary-stream", "mate-chat", "mate-upload"]
+
+DOCUMENT_WORDS = (
+    "index vector query document retrieval embedding chunk answer model page "
+    "section table figure summary report result method data value system user"
+).split()
+
+
+def configure_environment(work_dir):
+    # Must run before the app is imported: fakes on, all state in a scratch directory
+    os.environ["APP_PROVIDERS"] = "fake"
+    os.environ.setdefault("VISIONARY_TTS_PREWARM", "0")
+    os.environ["MATE_INDEX_DIR"] = os.path.join(work_dir, "index")
+    os.environ["MATE_MEDIA_DIR"] = os.path.join(work_dir, "media")
+    os.environ["VISIONARY_TTS_CACHE_DIR"] = os.path.join(work_dir, "tts")
+    os.environ["APP_STATE_DB"] = os.path.join(work_dir, "state.db")
+
+
+def synthetic_frame(seed, width=1280, height=720):
+    try:
+        from PIL import Image
+    except ImportError:
+        return os.urandom(200_000)
+    rng = random.Random(seed)
+    image = Image.new("RGB", (width, height), tuple(rng.randrange(256) for _ in range(3)))
+    output = io.BytesIO()
+    image.save(output, format="JPEG", quality=92)
+    return output.getvalue()
+
+
+def synthetic_document(seed, words=2000):
+    rng = random.Random(seed)
+    return " ".join(rng.choice(DOCUMENT_WORDS) for _ in range(words)).encode()
+
+
+class Workload:
+    def __init__(self, client, sessions):
+        self.client = client
+        self.sessions = sessions
+        self.frames = [synthetic_frame(seed) for seed in range(8)]
+        self.counter = 0
+
+    def _media(self):
+        self.counter += 1
+        return {
+            "audio": ("recording.webm", os.urandom(16_000), "audio/webm"),
+            "image": ("capture.jpg", random.choice(self.frames), "image/jpeg"),
+        }
+
+    async def visionary(self):
+        return await self.client.post("/visionary/process_audio_and_image", files=self._media())
+
+    async def visionary_stream(self):
+        return await self.client.post("/visionary/process_audio_and_image/stream", files=self._media())
+
+    async def mate_chat(self):
+        self.counter += 1
+        session = random.choice(self.sessions)
+        question = f"What does the report say about {random.choice(DOCUMENT_WORDS)} {self.counter}?"
+        return await self.client.post("/mate/chat", json={"message": question}, headers={"X-Session-Id": session})
+
+    async def mate_upload(self):
+        self.counter += 1
+        files = {"file": (f"load_{self.counter}.txt", synthetic_document(self.counter), "text/plain")}
+        return await self.client.post("/mate/upload", files=files, headers={"X-Session-Id": random.choice(self.sessions)})
+
+
+async def seed_sessions(client, sessions, documents):
+    # Chat needs indexed documents, so every session gets a few first
+    for session in sessions:
+        for number in range(documents):
+            files = {"file": (f"seed_{number}.txt", synthetic_document(number), "text/plain")}
+            response = await client.post("/mate/upload", files=files, headers={"X-Session-Id": session})
+            response.raise_for_status()
+
+
+async def run_load(workload, scenarios, rps, duration):
+    from common.fakes import provider_timings
+
+    results = {scenario: [] for scenario in scenarios}
+    started = time.perf_counter()
+
+    async def one_request(scenario, scheduled):
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        timings = {}
+        provider_timings.set(timings)
+        try:
+            response = await getattr(workload, scenario.replace("-", "_"))()
+            ok = response.status_code < 400 and b'"error"' not in response.content
+        except Exception:
+            ok = False
+        # Measured from the scheduled send time, so waiting behind a busy loop counts
+        results[scenario].append((ok, time.perf_counter() - scheduled, timings))
+
+    tasks = []
+    for number in range(int(rps * duration)):
+        scenario = scenarios[number % len(scenarios)]
+        tasks.append(asyncio.create_task(one_request(scenario, started + number / rps)))
+    await asyncio.gather(*tasks)
+    return results, time.perf_counter() - started
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def report(results, elapsed):
+    for scenario, samples in results.items():
+        if not samples:
+            continue
+        latencies = [latency for _, latency, _ in samples]
+        errors = sum(1 for ok, _, _ in samples if not ok)
+        print(
+            f"{scenario:<18} requests={len(samples):<6} errors={errors:<5} rps={len(samples) / elapsed:7.1f} "
+            f"p50={percentile(latencies, 50) * 1000:8.1f}ms p95={percentile(latencies, 95) * 1000:8.1f}ms "
+            f"p99={percentile(latencies, 99) * 1000:8.1f}ms"
+        )
+        stages = {}
+        for _, _, timings in samples:
+            for stage, seconds in timings.items():
+                stages[stage] = stages.get(stage, 0.0) + seconds
+        mean_total = statistics.mean(latencies)
+        breakdown = {stage: seconds / len(samples) for stage, seconds in sorted(stages.items())}
+        breakdown["app"] = max(0.0, mean_total - sum(breakdown.values()))
+        print("    stages: " + "  ".join(f"{stage}={seconds * 1000:.1f}ms" for stage, seconds in breakdown.items()))
+
+
+async def main_async(args):
+    import httpx
+
+    from main import app
+
+    scenarios = SCENARIOS if args.scenario == "mixed" else [args.scenario]
+    sessions = [f"load-session-{number}" for number in range(args.sessions)]
+    # Runs the startup and shutdown hooks, which ASGITransport does not send
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://load-test", timeout=None) as client:
+            if "mate-chat" in scenarios:
+                await seed_sessions(client, sessions, args.seed_documents)
+            workload = Workload(client, sessions)
+            results, elapsed = await run_load(workload, scenarios, args.rps, args.duration)
+    print(f"scenario={args.scenario} target rps={args.rps} duration={args.duration}s")
+    report(results, elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scenario", choices=SCENARIOS + ["mixed"], default="visionary")
+    parser.add_argument("--rps", type=float, default=20, help="target request rate across all scenarios")
+    parser.add_argument("--duration", type=float, default=30, help="seconds of load")
+    parser.add_argument("--sessions", type=int, default=4, help="mate sessions to spread chats over")
+    parser.add_argument("--seed-documents", type=int, default=3, help="documents indexed per session before chatting")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="load-test-") as work_dir:
+        configure_environment(work_dir)
+        asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# benchmarks/mate_bulk_ingest.py
+#
+# Measures bulk ingest throughput in files/minute for several parse worker
+# counts: parallel parsing in the process pool, then one batched insert into
+# a fresh index. Uses a synthetic corpus unless --source-dir points at real
+# documents (PDF, DOCX, XLSX, ...).
+#
+#   python -m benchmarks.mate_bulk_ingest --files 200 --workers 1,2,4,8
+#   python -m benchmarks.mate_bulk_ingest --source-dir ~/papers --mock-embed
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from llama_index.core import Settings
+from llama_index.core.embeddings import MockEmbedding
+
+from multimodal_mate.index_store import PersistentIndex
+from multimodal_mate.ingest import create_parse_pool, parse_files
+
+WORDS = (
+    "index vector query document retrieval embedding chunk answer model page "
+    "section table figure summary report result method data value system user"
+).split()
+
+
+def synthetic_corpus(directory, count, words_per_file):
+    rng = random.Random(0)
+    paths = []
+    for number in range(count):
+        path = os.path.join(directory, f"document_{number:04d}.md")
+        with open(path, "w") as target:
+            target.write(f"# Document {number}\n\n")
+            target.write(" ".join(rng.choice(WORDS) for _ in range(words_per_file)))
+        paths.append(path)
+    return paths
+
+
+def source_corpus(directory):
+    return sorted(
+        os.path.join(root, name)
+        for root, _, names in os.walk(directory)
+        for name in names
+        if not name.startswith(".")
+    )
+
+
+async def run(paths, workers, index_documents):
+    pool = create_parse_pool(workers)
+    try:
+        # Start every worker process before timing
+        await asyncio.gather(*(asyncio.get_running_loop().run_in_executor(pool, time.sleep, 0.1) for _ in range(workers)))
+
+        start = time.perf_counter()
+        parsed, failures = await parse_files(pool, paths)
+        parse_seconds = time.perf_counter() - start
+    finally:
+        pool.shutdown()
+
+    index_seconds = 0.0
+    if index_documents:
+        documents = []
+        for path, file_documents in parsed.items():
+            for page_number, document in enumerate(file_documents):
+                document.id_ = f"{os.path.basename(path)}#{page_number}"
+                documents.append(document)
+        persist_dir = tempfile.mkdtemp(prefix="mate-bulk-bench-")
+        try:
+            start = time.perf_counter()
+            await asyncio.to_thread(PersistentIndex(persist_dir).insert_documents, documents)
+            index_seconds = time.perf_counter() - start
+        finally:
+            shutil.rmtree(persist_dir, ignore_errors=True)
+
+    total = parse_seconds + index_seconds
+    print(
+        f"workers={workers:<3} files={len(parsed):<5} failed={len(failures):<3} "
+        f"parse={parse_seconds:7.2f}s index={index_seconds:7.2f}s "
+        f"parse files/min={len(parsed) / parse_seconds * 60:9.1f} "
+        f"total files/min={len(parsed) / total * 60:9.1f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=200, help="size of the synthetic corpus")
+    parser.add_argument("--words-per-file", type=int, default=3000)
+    parser.add_argument("--source-dir", help="ingest these documents instead of a synthetic corpus")
+    parser.add_argument("--workers", default=f"1,2,4,{os.cpu_count()}")
+    parser.add_argument("--no-index", action="store_true", help="only measure parsing")
+    parser.add_argument("--mock-embed", action="store_true", help="use a mock embedding instead of MiniLM")
+    args = parser.parse_args()
+
+    if args.mock_embed:
+        Settings.embed_model = MockEmbedding(embed_dim=384)
+    elif not args.no_index:
+        from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+        Settings.embed_model = HuggingFaceEmbedding(model_name="sentence-transformers/all-MiniLM-L6-v2")
+
+    corpus_dir = tempfile.mkdtemp(prefix="mate-bulk-corpus-")
+    try:
+        if args.source_dir:
+            paths = source_corpus(args.source_dir)
+        else:
+            paths = synthetic_corpus(corpus_dir, args.files, args.words_per_file)
+        for workers in sorted({int(count) for count in args.workers.split(",")}):
+            asyncio.run(run(paths, workers, not args.no_index))
+    finally:
+        shutil.rmtree(corpus_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# benchmarks/mate_index.py
+#
+# Measures ingest and cold-start time of the persistent mate index over a
+# synthetic corpus.
+#
+#   python -m benchmarks.mate_index --pages 3000
+#   python -m benchmarks.mate_index --pages 3000 --mock-embed   # skip the real model
+import argparse
+import random
+import shutil
+import tempfile
+import time
+
+from llama_index.core import Document, Settings
+from llama_index.core.embeddings import MockEmbedding
+
+from multimodal_mate.index_store import PersistentIndex
+
+WORDS = (
+    "index vector query document retrieval embedding chunk answer model page "
+    "section table figure summary report result method data value system user"
+).split()
+
+
+def synthetic_pages(count, words_per_page, seed=0):
+    rng = random.Random(seed)
+    return [
+        Document(
+            text=" ".join(rng.choice(WORDS) for _ in range(words_per_page)),
+            id_=f"corpus.pdf#{page}",
+        )
+        for page in range(count)
+    ]
+
+
+def timed(label, func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    print(f"{label:<28} {time.perf_counter() - start:8.2f}s  {result if result is not None else ''}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=3000)
+    parser.add_argument("--words-per-page", type=int, default=300)
+    parser.add_argument("--mock-embed", action="store_true", help="use a mock embedding instead of MiniLM")
+    args = parser.parse_args()
+
+    if args.mock_embed:
+        Settings.embed_model = MockEmbedding(embed_dim=384)
+    else:
+        from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+        Settings.embed_model = HuggingFaceEmbedding(model_name="sentence-transformers/all-MiniLM-L6-v2")
+
+    pages = synthetic_pages(args.pages, args.words_per_page)
+    persist_dir = tempfile.mkdtemp(prefix="mate-index-bench-")
+    try:
+        index = PersistentIndex(persist_dir)
+        timed("initial ingest (added, skipped)", index.insert_documents, pages)
+        timed("re-ingest unchanged", index.insert_documents, pages)
+
+        changed = synthetic_pages(1, args.words_per_page, seed=1)
+        changed[0].id_ = pages[0].id_
+        timed("re-ingest one changed page", index.insert_documents, changed)
+
+        cold = PersistentIndex(persist_dir)
+        timed("cold start (first load)", lambda: len(cold.documents()))
+    finally:
+        shutil.rmtree(persist_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
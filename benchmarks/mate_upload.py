@@ -0,0 +1,135 @@
+# benchmarks/mate_upload.py
+#
+# Uploads one large file to a running server and measures what it costs
+# everyone else: event-loop lag seen by a cheap endpoint pinged during the
+# upload, and the server's peak RSS. Starts its own uvicorn process so the
+# RSS reading belongs to the server alone:
+#
+#   python -m benchmarks.mate_upload --size-mb 200
+#   python -m benchmarks.mate_upload --size-mb 200 --endpoint upload
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+PING_PATH = "/mate/index_stats"
+
+
+def write_test_file(path, size_mb):
+    # Text, so the document parser has real work to do after the upload
+    line = b"The quick brown fox jumps over the lazy dog while the index keeps growing.\n"
+    block = line * (1024 * 1024 // len(line))
+    with open(path, "wb") as target:
+        for _ in range(size_mb):
+            target.write(block)
+
+
+def peak_rss_bytes(pid):
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+async def wait_until_ready(client, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            await client.get(PING_PATH)
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError("server did not start")
+
+
+async def ping_loop(client, stop, interval):
+    latencies = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get(PING_PATH)
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(interval)
+    return latencies
+
+
+async def file_chunks(path, chunk_size=1024 * 1024):
+    # httpx.AsyncClient needs an async iterable; reads stay off the event loop
+    with open(path, "rb") as source:
+        while chunk := await asyncio.to_thread(source.read, chunk_size):
+            yield chunk
+
+
+async def upload(client, path, endpoint):
+    filename = os.path.basename(path)
+    if endpoint == "upload":
+        with open(path, "rb") as source:
+            response = await client.post("/mate/upload", files={"file": (filename, source, "text/plain")})
+        return response.json()
+
+    response = await client.post(f"/mate/ingest?filename={filename}", content=file_chunks(path))
+    job = response.json()
+    while True:
+        await asyncio.sleep(0.5)
+        state = (await client.get(job["status_url"])).json()
+        if state["status"] in ("done", "failed"):
+            return state
+
+
+async def run(args, server_pid):
+    base_url = f"http://127.0.0.1:{args.port}"
+    async with httpx.AsyncClient(base_url=base_url, timeout=None) as client:
+        await wait_until_ready(client)
+        baseline_rss = peak_rss_bytes(server_pid)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "large_upload.txt")
+            write_test_file(path, args.size_mb)
+
+            stop = asyncio.Event()
+            pinger = asyncio.create_task(ping_loop(client, stop, args.ping_interval))
+            start = time.perf_counter()
+            result = await upload(client, path, args.endpoint)
+            elapsed = time.perf_counter() - start
+            stop.set()
+            latencies = sorted(await pinger)
+
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"endpoint={args.endpoint} size={args.size_mb} MB total={elapsed:.1f}s status={result.get('status', 'inline')}")
+    print(
+        f"ping during upload: n={len(latencies)} p50={statistics.median(latencies) * 1000:.1f}ms "
+        f"p99={p99 * 1000:.1f}ms max={latencies[-1] * 1000:.1f}ms"
+    )
+    print(
+        f"server peak RSS: {peak_rss_bytes(server_pid) / 1024 / 1024:.0f} MB "
+        f"(before upload {baseline_rss / 1024 / 1024:.0f} MB)"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size-mb", type=int, default=200)
+    parser.add_argument("--endpoint", choices=["ingest", "upload"], default="ingest")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--ping-interval", type=float, default=0.05)
+    args = parser.parse_args()
+
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port), "--log-level", "warning"],
+        env={**os.environ, "MATE_MAX_UPLOAD_BYTES": str((args.size_mb + 1) * 1024 * 1024)},
+    )
+    try:
+        asyncio.run(run(args, server.pid))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
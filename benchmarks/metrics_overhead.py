@@ -0,0 +1,100 @@
+# benchmarks/metrics_overhead.py
+#
+# Cost of the instrumentation itself: time per span, per provider call span
+# and per request through MetricsMiddleware, against an empty baseline.
+# Also checks that routes of routers included with different prefixes (the
+# index pages of /mate/ and /visionary/) are recorded as separate series.
+#
+#   python -m benchmarks.metrics_overhead --iterations 200000
+import argparse
+import asyncio
+import time
+
+import httpx
+from fastapi import APIRouter, FastAPI
+
+from common.metrics import MetricsMiddleware, provider_call, render_metrics, request_spans, span
+
+ROUTE_LABELS = ['route="/mate/"', 'route="/visionary/"', 'route="/mate/jobs/{job_id}"', 'route="/visionary/jobs/{job_id}"']
+
+
+def per_call_ns(func, iterations):
+    start = time.perf_counter_ns()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter_ns() - start) / iterations
+
+
+def empty():
+    pass
+
+
+def one_span():
+    with span("benchmark_stage"):
+        pass
+
+
+def one_provider_call():
+    with provider_call("benchmark_provider"):
+        pass
+
+
+async def empty_app(scope, receive, send):
+    with span("benchmark_stage"):
+        pass
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def requests_ns(app, iterations):
+    scope = {"type": "http", "path": "/benchmark", "method": "GET"}
+
+    async def send(message):
+        pass
+
+    start = time.perf_counter_ns()
+    for _ in range(iterations):
+        await app(dict(scope), None, send)
+    return (time.perf_counter_ns() - start) / iterations
+
+
+async def route_labels():
+    # Same layout as main.py: routers with identical paths under two prefixes
+    app = FastAPI()
+    for prefix in ("/mate", "/visionary"):
+        router = APIRouter()
+        router.add_api_route("/", lambda: {}, methods=["GET"])
+        router.add_api_route("/jobs/{job_id}", lambda job_id: {}, methods=["GET"])
+        app.include_router(router, prefix=prefix)
+    app.add_middleware(MetricsMiddleware)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for path in ("/mate/", "/visionary/", "/mate/jobs/1", "/visionary/jobs/2"):
+            await client.get(path)
+    return [label for label in ROUTE_LABELS if label not in render_metrics()]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=200000)
+    args = parser.parse_args()
+
+    baseline = per_call_ns(empty, args.iterations)
+    print(f"span (no request):          {per_call_ns(one_span, args.iterations) - baseline:8.0f} ns")
+    print(f"provider call span:         {per_call_ns(one_provider_call, args.iterations) - baseline:8.0f} ns")
+    request_spans.set([])
+    print(f"span (inside a request):    {per_call_ns(one_span, args.iterations // 10) - baseline:8.0f} ns")
+
+    bare = asyncio.run(requests_ns(empty_app, args.iterations // 10))
+    wrapped = asyncio.run(requests_ns(MetricsMiddleware(empty_app), args.iterations // 10))
+    print(f"middleware per request:     {wrapped - bare:8.0f} ns")
+    print(f"/metrics render:            {len(render_metrics())} bytes")
+
+    missing = asyncio.run(route_labels())
+    print(f"prefixed route labels:      {'distinct' if not missing else 'missing ' + ', '.join(missing)}")
+    if missing:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
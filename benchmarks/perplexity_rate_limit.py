@@ -0,0 +1,148 @@
+# benchmarks/perplexity_rate_limit.py
+#
+# Drives search_perplexity against a local stub of the Perplexity API and
+# checks the limiter: the rate that reaches the stub, fast rejection once
+# the wait queue is full, latency of accepted calls, and how many
+# connections were opened (keep-alive reuse). With --processes > 1 every
+# worker shares one bucket through a SQLite file, as separate uvicorn
+# workers would.
+#
+#   python -m benchmarks.perplexity_rate_limit --calls 60 --rate-per-minute 120
+#   python -m benchmarks.perplexity_rate_limit --processes 4 --calls 30
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+STUB_RESPONSE = json.dumps({"choices": [{"message": {"content": "A stub answer."}}]}).encode()
+
+
+class StubPerplexity:
+    """Minimal keep-alive HTTP/1.1 server answering every POST after a fixed delay."""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.connections = 0
+        self.request_times = []
+        self.port = None
+        self._ready = threading.Event()
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.decode("latin-1").split("\r\n"):
+                    name, _, value = line.partition(":")
+                    if name.lower() == "content-length":
+                        length = int(value)
+                await reader.readexactly(length)
+                self.request_times.append(time.time())
+                await asyncio.sleep(self.latency)
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    + f"Content-Length: {len(STUB_RESPONSE)}\r\n\r\n".encode()
+                    + STUB_RESPONSE
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _serve(self):
+        server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = server.sockets[0].getsockname()[1]
+        self._ready.set()
+        async with server:
+            await server.serve_forever()
+
+    def start(self):
+        threading.Thread(target=lambda: asyncio.run(self._serve()), daemon=True).start()
+        self._ready.wait()
+
+
+def worker(env, calls, arrival_interval):
+    # Runs in a fresh process: configure through the environment, then import
+    os.environ.update(env)
+    from visionary import visionary
+
+    async def run():
+        async def one_call(number, delay):
+            await asyncio.sleep(delay)
+            start = time.perf_counter()
+            # Distinct queries, so the search cache does not absorb the load
+            answer = await visionary.search_perplexity(f"what is the weather today in city {os.getpid()}-{number}")
+            return answer != visionary.SEARCH_BUSY_MESSAGE, time.perf_counter() - start
+
+        results = await asyncio.gather(*(one_call(i, i * arrival_interval) for i in range(calls)))
+        await visionary.http_client.aclose()
+        return results
+
+    return asyncio.run(run())
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=60, help="calls per process")
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--arrival-rps", type=float, default=50, help="call arrival rate per process")
+    parser.add_argument("--rate-per-minute", type=float, default=120)
+    parser.add_argument("--burst", type=float, default=5)
+    parser.add_argument("--max-waiters", type=int, default=16)
+    parser.add_argument("--stub-latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    stub = StubPerplexity(args.stub_latency)
+    stub.start()
+    db_dir = tempfile.mkdtemp(prefix="rate-limit-bench-")
+    env = {
+        "PERPLEXITY_API_URL": f"http://127.0.0.1:{stub.port}/chat/completions",
+        "PERPLEXITY_API_KEY": "stub",
+        "VISIONARY_TTS_PREWARM": "0",
+        "VISIONARY_PERPLEXITY_RATE_PER_MINUTE": str(args.rate_per_minute),
+        "VISIONARY_PERPLEXITY_BURST": str(args.burst),
+        "VISIONARY_PERPLEXITY_MAX_WAITERS": str(args.max_waiters),
+    }
+    if args.processes > 1:
+        # One bucket for all processes, in a fresh database so earlier runs do not drain it
+        env["APP_STATE_DB"] = os.path.join(db_dir, "state.db")
+    else:
+        env["APP_SHARED_STATE"] = "0"
+
+    with multiprocessing.get_context("spawn").Pool(args.processes) as pool:
+        results = pool.starmap(worker, [(env, args.calls, 1 / args.arrival_rps)] * args.processes)
+    results = [result for process_results in results for result in process_results]
+
+    accepted = sorted(latency for ok, latency in results if ok)
+    rejected = len(results) - len(accepted)
+    times = sorted(stub.request_times)
+    # Tokens beyond the initial burst arrive at the configured rate
+    steady = times[int(args.burst):]
+    observed = (len(steady) - 1) / (steady[-1] - steady[0]) * 60 if len(steady) > 1 else 0.0
+    connection_limit = int(os.getenv("VISIONARY_PERPLEXITY_CONCURRENCY", "4")) * args.processes
+
+    print(f"calls={len(results)} accepted={len(accepted)} rejected={rejected} processes={args.processes}")
+    print(f"rate at stub: {observed:.1f}/min (configured {args.rate_per_minute:.1f}/min, burst {args.burst:g})")
+    if accepted:
+        p99 = accepted[min(len(accepted) - 1, int(len(accepted) * 0.99))]
+        print(f"accepted latency: p50={statistics.median(accepted) * 1000:.0f}ms p99={p99 * 1000:.0f}ms")
+    print(f"connections opened: {stub.connections} (pool limit {connection_limit})")
+
+    checks = {
+        "rate within 10%": abs(observed - args.rate_per_minute) <= args.rate_per_minute * 0.1 or len(steady) < 2,
+        "excess calls rejected": rejected > 0 or len(results) <= args.max_waiters * args.processes + args.burst,
+        "connections reused": stub.connections <= connection_limit,
+    }
+    for name, passed in checks.items():
+        print(f"{'PASS' if passed else 'FAIL'} {name}")
+
+
+if __name__ == "__main__":
+    main()
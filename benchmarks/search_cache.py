@@ -0,0 +1,105 @@
+# benchmarks/search_cache.py
+#
+# Replays a skewed stream of search queries (a few popular questions asked
+# many times, with varied casing and punctuation, plus a long tail) through
+# the search path against the local stub three ways: straight to
+# fetch_perplexity as before the cache existed, with only the coalescing of
+# identical in-flight queries (VISIONARY_SEARCH_CACHE_SIZE=0), and with the
+# cache and coalescing together. Reports upstream calls, rate-limit
+# rejections and latency.
+#
+#   python -m benchmarks.search_cache --queries 300 --arrival-rps 20
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import statistics
+import time
+
+from benchmarks.perplexity_rate_limit import StubPerplexity
+
+POPULAR = [
+    "what is the weather today",
+    "who won the match between india and australia",
+    "what is the score of the football match",
+    "cuál es el precio actual de las acciones de tesla",
+    "आज का मौसम कैसा है",
+]
+
+
+def query_stream(count, popular_share, seed=0):
+    rng = random.Random(seed)
+    queries = []
+    for number in range(count):
+        if rng.random() < popular_share:
+            # Zipf-like: the first questions are asked most often
+            query = POPULAR[min(int(rng.paretovariate(1.2)) - 1, len(POPULAR) - 1)]
+            query = rng.choice([query, query.capitalize(), query + "?", "..." + query, query.upper()])
+        else:
+            query = f"what happened to company {number}"
+        queries.append(query)
+    return queries
+
+
+def worker(env, queries, arrival_interval, use_cache):
+    os.environ.update(env)
+    from visionary import visionary
+
+    search = visionary.search_perplexity if use_cache else visionary.fetch_perplexity
+
+    async def run():
+        async def one_call(query, delay):
+            await asyncio.sleep(delay)
+            start = time.perf_counter()
+            answer = await search(query)
+            return answer != visionary.SEARCH_BUSY_MESSAGE, time.perf_counter() - start
+
+        results = await asyncio.gather(*(one_call(query, i * arrival_interval) for i, query in enumerate(queries)))
+        await visionary.http_client.aclose()
+        return results, visionary.search_cache.stats()
+
+    return asyncio.run(run())
+
+
+def run(label, stub, env, queries, arrival_interval, use_cache=True):
+    calls_before = len(stub.request_times)
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        results, stats = pool.apply(worker, (env, queries, arrival_interval, use_cache))
+    latencies = sorted(latency for ok, latency in results if ok)
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    print(
+        f"{label:<19} upstream calls={len(stub.request_times) - calls_before:<5} "
+        f"rejected={len(results) - len(latencies):<5} p50={statistics.median(latencies) * 1000:7.1f}ms "
+        f"p95={p95 * 1000:7.1f}ms hit_rate={stats['hit_rate']:.2f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--popular-share", type=float, default=0.7)
+    parser.add_argument("--arrival-rps", type=float, default=20)
+    parser.add_argument("--rate-per-minute", type=float, default=120)
+    parser.add_argument("--stub-latency", type=float, default=0.3)
+    args = parser.parse_args()
+
+    stub = StubPerplexity(args.stub_latency)
+    stub.start()
+    env = {
+        "PERPLEXITY_API_URL": f"http://127.0.0.1:{stub.port}/chat/completions",
+        "PERPLEXITY_API_KEY": "stub",
+        "VISIONARY_TTS_PREWARM": "0",
+        "VISIONARY_PERPLEXITY_RATE_PER_MINUTE": str(args.rate_per_minute),
+        # The in-process cache only; a shared entry would carry over between runs
+        "APP_SHARED_STATE": "0",
+    }
+    queries = query_stream(args.queries, args.popular_share)
+    interval = 1 / args.arrival_rps
+    run("no cache", stub, env, queries, interval, use_cache=False)
+    run("coalescing only", stub, {**env, "VISIONARY_SEARCH_CACHE_SIZE": "0"}, queries, interval)
+    run("cache + coalescing", stub, env, queries, interval)
+
+
+if __name__ == "__main__":
+    main()
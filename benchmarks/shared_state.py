@@ -0,0 +1,67 @@
+# benchmarks/shared_state.py
+#
+# Cost and correctness of the shared state database under several worker
+# processes: each process checks index versions (done on every index
+# access), reads and writes cache records and bumps a shared version. At the
+# end the version must equal the total number of bumps, with no lost updates.
+#
+#   python -m benchmarks.shared_state --processes 4 --operations 2000
+import argparse
+import multiprocessing
+import os
+import statistics
+import tempfile
+import time
+
+from common.shared_state import SharedState
+
+
+def per_op_us(func, operations):
+    samples = []
+    for number in range(operations):
+        start = time.perf_counter()
+        func(number)
+        samples.append((time.perf_counter() - start) * 1_000_000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.99)]
+
+
+def worker(path, worker_id, processes, operations, start_at):
+    state = SharedState(path)
+    time.sleep(max(0.0, start_at - time.time()))
+    results = {
+        "version": per_op_us(lambda number: state.version("index:bench"), operations),
+        "put": per_op_us(lambda number: state.put("bench", f"{worker_id}:{number}", "x" * 200, 60), operations),
+        "get": per_op_us(lambda number: state.get("bench", f"{number % processes}:{number}"), operations),
+        "bump_version": per_op_us(lambda number: state.bump_version("index:bench"), operations // 10),
+    }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--operations", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="shared-state-bench-") as work_dir:
+        path = os.path.join(work_dir, "state.db")
+        SharedState(path)
+        start_at = time.time() + 1.0
+        jobs = [(path, worker_id, args.processes, args.operations, start_at) for worker_id in range(args.processes)]
+        with multiprocessing.get_context("spawn").Pool(args.processes) as pool:
+            results = pool.starmap(worker, jobs)
+
+        state = SharedState(path)
+        bumps = args.processes * (args.operations // 10)
+        print(f"processes={args.processes} operations={args.operations} per process")
+        for operation in results[0]:
+            medians = [result[operation][0] for result in results]
+            p99s = [result[operation][1] for result in results]
+            print(f"{operation:<14} p50={statistics.mean(medians):8.1f}us  p99={max(p99s):8.1f}us")
+        print(f"version={state.version('index:bench')} (expected {bumps})")
+        print(f"records={state.count('bench')} (expected {args.processes * args.operations})")
+
+
+if __name__ == "__main__":
+    main()
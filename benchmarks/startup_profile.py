@@ -0,0 +1,71 @@
+# benchmarks/startup_profile.py
+#
+# Reports worker cold-start cost: wall time and RSS growth for each import on
+# the app's startup path, then for each lazy initializer when warmed up.
+# Run it in a fresh interpreter so nothing is already imported:
+#
+#   python -m benchmarks.startup_profile
+#   python -m benchmarks.startup_profile --no-warm-up --json
+import argparse
+import asyncio
+import importlib
+import json
+import time
+
+from common.lazy import Lazy, current_rss_bytes
+
+# Heavy dependencies first, so the app modules' own cost is reported separately
+IMPORTS = [
+    "fastapi",
+    "google.generativeai",
+    "google.cloud.texttospeech_v1",
+    "llama_index.core",
+    "multimodal_mate.mate",
+    "visionary.visionary",
+    "main",
+]
+
+
+def profile_imports():
+    rows = []
+    for module_name in IMPORTS:
+        rss_before = current_rss_bytes()
+        start = time.perf_counter()
+        importlib.import_module(module_name)
+        rows.append({
+            "name": f"import {module_name}",
+            "seconds": time.perf_counter() - start,
+            "rss_bytes": current_rss_bytes() - rss_before,
+        })
+    return rows
+
+
+async def warm_up_all():
+    from multimodal_mate.mate import warm_up as warm_up_mate
+    from visionary.visionary import warm_up as warm_up_visionary
+    await warm_up_mate()
+    await warm_up_visionary()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--no-warm-up", action="store_true", help="only profile imports")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    rows = profile_imports()
+    if not args.no_warm_up:
+        asyncio.run(warm_up_all())
+        rows.extend({**row, "name": f"init {row['name']}"} for row in Lazy.report())
+    rows.append({"name": "total RSS", "seconds": None, "rss_bytes": current_rss_bytes()})
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+    for row in rows:
+        seconds = f"{row['seconds']:8.3f}s" if row["seconds"] is not None else " " * 9
+        print(f"{row['name']:<44} {seconds} {row['rss_bytes'] / 1024 / 1024:9.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
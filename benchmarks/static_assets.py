@@ -0,0 +1,83 @@
+# benchmarks/static_assets.py
+#
+# Bytes sent per page asset on a first visit (identity, gzip, brotli) and on
+# repeat visits, where plain URLs are revalidated with a 304 and
+# fingerprinted URLs are not requested at all. Also times a request through
+# the asset app for each case.
+#
+#   python -m benchmarks.static_assets --iterations 20000
+import argparse
+import asyncio
+import time
+
+from common.assets import AssetStore
+
+DIRECTORIES = {
+    "/static": "static",
+    "/mate/static": "multimodal_mate/static",
+    "/visionary/static": "visionary/static",
+}
+
+
+async def request(store, path, headers):
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": f"{store.url_prefix}/{path}",
+        "root_path": store.url_prefix,
+        "headers": [(name.encode(), value.encode()) for name, value in headers.items()],
+    }
+    response = {}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["headers"] = {name.decode(): value.decode() for name, value in message["headers"]}
+        else:
+            response["body"] = message["body"]
+
+    await store(scope, None, send)
+    return response
+
+
+async def per_request_us(store, path, headers, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await request(store, path, headers)
+    return (time.perf_counter() - start) / iterations * 1_000_000
+
+
+async def run(iterations):
+    for url_prefix, directory in DIRECTORIES.items():
+        store = AssetStore(directory, url_prefix)
+        start = time.perf_counter()
+        store.load()
+        print(f"{url_prefix}: loaded in {(time.perf_counter() - start) * 1000:.1f}ms")
+
+        for path in store.paths():
+            fingerprinted = store.url(path).removeprefix(url_prefix + "/")
+            sizes = []
+            for accept in ("identity", "gzip", "br, gzip"):
+                response = await request(store, path, {"accept-encoding": accept})
+                sizes.append(len(response["body"]))
+            etag = response["headers"]["etag"]
+            revalidated = await request(store, path, {"accept-encoding": "br, gzip", "if-none-match": etag})
+            immutable = await request(store, fingerprinted, {"accept-encoding": "br, gzip"})
+            print(
+                f"  {path:<16} identity={sizes[0]:<7} gzip={sizes[1]:<7} br={sizes[2]:<7} "
+                f"repeat: plain={revalidated['status']} fingerprinted={immutable['headers']['cache-control']}"
+            )
+            full = await per_request_us(store, path, {"accept-encoding": "br, gzip"}, iterations)
+            not_modified = await per_request_us(store, path, {"if-none-match": etag}, iterations)
+            print(f"  {'':<16} 200 in {full:.1f}us, 304 in {not_modified:.1f}us")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+    asyncio.run(run(args.iterations))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# benchmarks/visionary_concurrency.py
+#
+# Drives POST /visionary/process_audio_and_image in-process (httpx's ASGI
+# transport) with the local fake providers, twice: with the fakes blocking
+# the event loop like the old synchronous Gemini and TTS clients
+# (FAKE_PROVIDERS_BLOCKING=1), and with the awaited, concurrency-limited
+# calls the handler makes now. Each run is a fresh process, since provider
+# clients and limits are configured at import.
+#
+#   python -m benchmarks.visionary_concurrency --clients 20 --requests 5
+import argparse
+import asyncio
+import multiprocessing
+import os
+import statistics
+import tempfile
+import time
+
+from benchmarks.load_test import configure_environment, synthetic_frame
+
+STUB_LATENCY_MS = {
+    "GEMINI": 300,
+    "TTS": 100,
+}
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run_clients(client, clients, requests_per_client, interval):
+    # Open-loop load: each request has a scheduled send time, and latency is
+    # measured from that time, so time spent waiting behind a blocked event
+    # loop is counted just like it would be for a real client
+    frames = [synthetic_frame(seed) for seed in range(4)]
+    latencies = []
+    errors = 0
+    started = time.perf_counter()
+
+    async def one_client(client_index):
+        nonlocal errors
+        for request_index in range(requests_per_client):
+            scheduled = started + request_index * interval + client_index * interval / clients
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            files = {
+                # A new recording every time, so the scene cache never answers
+                "audio": ("recording.webm", os.urandom(16_000), "audio/webm"),
+                "image": ("capture.jpg", frames[request_index % len(frames)], "image/jpeg"),
+            }
+            response = await client.post("/visionary/process_audio_and_image", files=files)
+            if response.status_code >= 400 or "error" in response.json():
+                errors += 1
+            latencies.append(time.perf_counter() - scheduled)
+
+    await asyncio.gather(*(one_client(i) for i in range(clients)))
+    return latencies, errors, time.perf_counter() - started
+
+
+def worker(env, clients, requests_per_client, interval):
+    # Runs in a fresh process: configure through the environment, then import
+    with tempfile.TemporaryDirectory(prefix="visionary-concurrency-") as work_dir:
+        configure_environment(work_dir)
+        os.environ.update(env)
+        import httpx
+
+        from main import app
+
+        async def run():
+            async with app.router.lifespan_context(app):
+                transport = httpx.ASGITransport(app=app)
+                async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+                    return await run_clients(client, clients, requests_per_client, interval)
+
+        return asyncio.run(run())
+
+
+def report(label, latencies, errors, elapsed):
+    print(
+        f"{label:<10} requests={len(latencies):<5} errors={errors:<4} "
+        f"p50={percentile(latencies, 50) * 1000:8.1f}ms "
+        f"p99={percentile(latencies, 99) * 1000:8.1f}ms "
+        f"mean={statistics.mean(latencies) * 1000:8.1f}ms "
+        f"wall={elapsed:6.2f}s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=5)
+    parser.add_argument("--interval", type=float, default=1.0, help="seconds between requests per client")
+    args = parser.parse_args()
+
+    env = {"VISIONARY_TTS_PREWARM": "0", "FAKE_GEMINI_SEARCH_RATE": "0", "FAKE_GEMINI_NAVIGATION_RATE": "0"}
+    for provider, latency_ms in STUB_LATENCY_MS.items():
+        env[f"FAKE_{provider}_LATENCY_MS"] = str(latency_ms)
+        env[f"FAKE_{provider}_JITTER_MS"] = "0"
+
+    print(f"{args.clients} concurrent clients x {args.requests} requests, provider latency (ms) {STUB_LATENCY_MS}")
+    context = multiprocessing.get_context("spawn")
+    for label, blocking in (("before", "1"), ("after", "0")):
+        with context.Pool(1) as pool:
+            result = pool.apply(worker, ({**env, "FAKE_PROVIDERS_BLOCKING": blocking}, args.clients, args.requests, args.interval))
+        report(label, *result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+# benchmarks/visionary_frames.py
+#
+# Measures the frame stage: bytes saved by downscaling and recompressing
+# camera frames, and the latency cut from that plus the scene cache, over a
+# session where the user keeps asking about the same scene.
+#
+# The cache is keyed the way the server keys it: by the transcript that
+# visionary.js sends as "question" when the browser has speech recognition,
+# and otherwise by the recorded audio, which differs on every recording (so
+# that path only gains from the smaller frames).
+#
+# Gemini is simulated by default (upload time at --uplink-mbps plus a fixed
+# inference time); --live sends the frames to the real model with a text
+# question instead of recorded audio.
+#
+#   python -m benchmarks.visionary_frames --frames 40 --repeat-rate 0.5
+#   python -m benchmarks.visionary_frames --width 4032 --height 3024 --live
+import argparse
+import asyncio
+import io
+import os
+import random
+import statistics
+import time
+
+from PIL import Image, ImageDraw, ImageFilter
+
+from visionary.frames import SceneCache, prepare_frame, question_key
+
+QUESTIONS = ["What is in front of me?", "Can I cross the road?", "What is this object?"]
+
+
+def synthetic_scene(width, height, seed):
+    rng = random.Random(seed)
+    image = Image.new("RGB", (width, height))
+    draw = ImageDraw.Draw(image)
+    for y in range(0, height, 8):
+        shade = int(60 + 120 * y / height)
+        draw.rectangle([0, y, width, y + 8], fill=(shade, shade + 20, 200 - shade // 2))
+    for _ in range(40):
+        x, y = rng.randrange(width), rng.randrange(height)
+        size = rng.randrange(width // 20, width // 4)
+        colour = tuple(rng.randrange(256) for _ in range(3))
+        draw.rectangle([x, y, x + size, y + size // 2], fill=colour)
+    return image.filter(ImageFilter.GaussianBlur(1))
+
+
+def camera_frame(scene, rng):
+    # The same scene seen again: slight sensor noise and exposure change
+    frame = scene.point(lambda value: min(255, int(value * rng.uniform(0.97, 1.03))))
+    noise = Image.effect_noise(scene.size, 6).convert("RGB")
+    frame = Image.blend(frame, noise, 0.04)
+    output = io.BytesIO()
+    # Browsers encode canvas.toBlob('image/jpeg') at quality 0.92
+    frame.save(output, format="JPEG", quality=92)
+    return output.getvalue()
+
+
+class SimulatedGemini:
+    def __init__(self, uplink_mbps, inference_ms):
+        self.uplink_bytes_per_second = uplink_mbps * 1_000_000 / 8
+        self.inference_seconds = inference_ms / 1000
+
+    async def answer(self, question, frame):
+        await asyncio.sleep(len(frame) / self.uplink_bytes_per_second + self.inference_seconds)
+        return f"An answer to {question}"
+
+
+class LiveGemini:
+    def __init__(self):
+        from visionary.visionary import model
+        self.model = model.get()
+
+    async def answer(self, question, frame):
+        response = await self.model.generate_content_async([question, {"mime_type": "image/jpeg", "data": frame}])
+        return response.text
+
+
+def session(args):
+    # (question, frame bytes) pairs; with probability repeat_rate the user asks
+    # the same question about the scene they were just pointing at
+    rng = random.Random(1)
+    scenes = [synthetic_scene(args.width, args.height, seed) for seed in range(args.scenes)]
+    requests = []
+    scene, question = 0, QUESTIONS[0]
+    for _ in range(args.frames):
+        if rng.random() >= args.repeat_rate:
+            scene, question = rng.randrange(args.scenes), rng.choice(QUESTIONS)
+        requests.append((question, camera_frame(scenes[scene], rng)))
+    return requests
+
+
+async def run_baseline(requests, gemini):
+    latencies = []
+    for question, frame in requests:
+        start = time.perf_counter()
+        await gemini.answer(question, frame)
+        latencies.append(time.perf_counter() - start)
+    return latencies, sum(len(frame) for _, frame in requests)
+
+
+async def run_prepared(requests, gemini, args, transcribed):
+    cache = SceneCache(max_distance=args.max_distance, ttl_seconds=args.ttl_seconds)
+    latencies, uploaded, prepare_seconds = [], 0, []
+    for question, frame in requests:
+        start = time.perf_counter()
+        prepared, frame_hash = await asyncio.to_thread(prepare_frame, frame, args.max_side, args.quality)
+        prepare_seconds.append(time.perf_counter() - start)
+        # A new recording of the same question never has the same bytes
+        key = question_key(question) if transcribed else question_key(audio=os.urandom(16_000))
+        if cache.lookup(key, frame_hash) is None:
+            uploaded += len(prepared)
+            cache.store(key, frame_hash, await gemini.answer(question, prepared))
+        latencies.append(time.perf_counter() - start)
+    return latencies, uploaded, prepare_seconds, cache.stats()
+
+
+def summary(latencies):
+    latencies = sorted(latencies)
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    return f"p50={statistics.median(latencies) * 1000:7.1f}ms p95={p95 * 1000:7.1f}ms"
+
+
+async def main_async(args):
+    gemini = LiveGemini() if args.live else SimulatedGemini(args.uplink_mbps, args.inference_ms)
+    requests = session(args)
+
+    baseline, baseline_bytes = await run_baseline(requests, gemini)
+    frame_sizes = [len(frame) for _, frame in requests]
+    print(f"frames={len(requests)} {args.width}x{args.height} avg frame={statistics.mean(frame_sizes) / 1024:.0f} KB")
+    print(f"before:            {summary(baseline)} uploaded={baseline_bytes / 1024 / 1024:.1f} MB")
+
+    for label, transcribed in (("after, transcript", True), ("after, audio only", False)):
+        prepared, prepared_bytes, prepare_seconds, stats = await run_prepared(requests, gemini, args, transcribed)
+        print(
+            f"{label}: {summary(prepared)} uploaded={prepared_bytes / 1024 / 1024:.1f} MB "
+            f"prepare p50={statistics.median(prepare_seconds) * 1000:.1f}ms "
+            f"bytes saved={(1 - prepared_bytes / baseline_bytes) * 100:.1f}% "
+            f"scene cache hits={stats['hits']} hit_rate={stats['hit_rate']:.2f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=40)
+    parser.add_argument("--scenes", type=int, default=5)
+    parser.add_argument("--repeat-rate", type=float, default=0.5, help="share of questions repeated about the same scene")
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--max-side", type=int, default=1024)
+    parser.add_argument("--quality", type=int, default=80)
+    parser.add_argument("--max-distance", type=int, default=6)
+    parser.add_argument("--ttl-seconds", type=float, default=30)
+    parser.add_argument("--uplink-mbps", type=float, default=5, help="simulated client-to-Gemini bandwidth")
+    parser.add_argument("--inference-ms", type=float, default=900, help="simulated Gemini processing time")
+    parser.add_argument("--live", action="store_true", help="call the real Gemini model")
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
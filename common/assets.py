@@ -0,0 +1,230 @@
+# common/assets.py
+#
+# Static files served from memory, precompressed once at startup (gzip, and
+# brotli when the brotli package is installed), with content-hash
+# fingerprinted URLs and ETags. Templates link to assets through
+# asset_url(), whose URLs can be cached forever; the plain URLs keep working
+# and are revalidated with the ETag instead.
+import gzip
+import hashlib
+import mimetypes
+import re
+import threading
+from pathlib import Path, PurePosixPath
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "application/xml", "image/svg+xml")
+MIN_COMPRESS_BYTES = 256
+FINGERPRINT_LENGTH = 12
+FINGERPRINTED_NAME = re.compile(r"^(?P<stem>.+)\.(?P<digest>[0-9a-f]{12})(?P<suffix>\.[^./]+)$")
+
+# Preferred first; identity is always available
+CONTENT_CODINGS = ("br", "gzip")
+
+
+class Asset:
+    """One file's bytes, its content hash and its precompressed variants."""
+
+    __slots__ = ("path", "media_type", "digest", "bodies")
+
+    def __init__(self, path, data):
+        self.path = path
+        media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        if media_type.startswith("text/") or media_type in ("application/javascript", "application/json"):
+            media_type += "; charset=utf-8"
+        self.media_type = media_type
+        self.digest = hashlib.sha256(data).hexdigest()[:FINGERPRINT_LENGTH]
+        self.bodies = {"identity": data}  # content coding -> body
+
+    @property
+    def fingerprinted_path(self):
+        # app.js -> app.3f2a9c1d7e0b.js; files without a suffix keep their path
+        path = PurePosixPath(self.path)
+        if not path.suffix:
+            return self.path
+        return str(path.with_name(f"{path.stem}.{self.digest}{path.suffix}"))
+
+    def precompress(self):
+        data = self.bodies["identity"]
+        if len(data) < MIN_COMPRESS_BYTES or not self.media_type.startswith(COMPRESSIBLE_TYPES):
+            return
+        candidates = {"gzip": gzip.compress(data, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            candidates["br"] = brotli.compress(data, quality=11)
+        for coding, body in candidates.items():
+            # A variant that barely shrinks is not worth the decompression
+            if len(body) < len(data) * 0.9:
+                self.bodies[coding] = body
+
+    def etag(self, coding):
+        return f'"{self.digest}"' if coding == "identity" else f'"{self.digest}-{coding}"'
+
+
+def accepted_codings(header):
+    # "gzip, br;q=0.8, *;q=0" -> {"gzip": 1.0, "br": 0.8, "*": 0.0}
+    codings = {}
+    for part in header.split(","):
+        name, _, params = part.partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        codings[name] = quality
+    return codings
+
+
+def etag_matches(header, etag):
+    tags = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return "*" in tags or etag in tags
+
+
+def _header(scope, name):
+    for key, value in scope.get("headers", []):
+        if key == name:
+            return value.decode("latin-1")
+    return ""
+
+
+def _route_path(scope):
+    # The path below the mount point, whichever way the router reports it
+    path = scope["path"]
+    root_path = scope.get("root_path", "")
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path):]
+    return path.lstrip("/")
+
+
+class AssetStore:
+    """An ASGI app serving one static directory from memory.
+
+    Mounted in place of StaticFiles. Files are read and compressed by
+    load(), normally once at startup, so files added later need a restart.
+    Fingerprinted URLs are served with immutable caching; the plain file
+    names are served with no-cache and an ETag, so existing links stay valid.
+    """
+
+    def __init__(self, directory, url_prefix, precompress=True):
+        self.directory = Path(directory)
+        self.url_prefix = url_prefix.rstrip("/")
+        self.precompress = precompress
+        self._assets = {}  # path -> Asset
+        self._fingerprinted = {}  # fingerprinted path -> Asset
+        self._loaded = False
+        self._lock = threading.Lock()
+        self.not_modified = 0
+
+    def load(self):
+        # Blocking (reads and compresses every file); call from a worker thread
+        assets = {}
+        for file_path in sorted(self.directory.rglob("*")):
+            relative = file_path.relative_to(self.directory)
+            if not file_path.is_file() or any(part.startswith(".") for part in relative.parts):
+                continue
+            asset = Asset(relative.as_posix(), file_path.read_bytes())
+            if self.precompress:
+                asset.precompress()
+            assets[asset.path] = asset
+        with self._lock:
+            self._assets = assets
+            self._fingerprinted = {asset.fingerprinted_path: asset for asset in assets.values()}
+            self._loaded = True
+
+    def _ensure_loaded(self):
+        # For apps run without the startup hook; two concurrent loads are harmless
+        if not self._loaded:
+            self.load()
+
+    def url(self, path):
+        # Unknown files get their plain URL, so a template never breaks on a missing asset
+        self._ensure_loaded()
+        asset = self._assets.get(path)
+        return f"{self.url_prefix}/{asset.fingerprinted_path if asset else path}"
+
+    def paths(self):
+        self._ensure_loaded()
+        return list(self._assets)
+
+    def resolve(self, path):
+        # (asset, immutable) or (None, False)
+        asset = self._fingerprinted.get(path)
+        if asset is not None and asset.fingerprinted_path != asset.path:
+            return asset, True
+        asset = self._assets.get(path)
+        if asset is not None:
+            return asset, False
+        # A fingerprint from an older deploy: serve the current file, but not as immutable
+        match = FINGERPRINTED_NAME.match(path)
+        if match:
+            return self._assets.get(match["stem"] + match["suffix"]), False
+        return None, False
+
+    def stats(self):
+        assets = list(self._assets.values())
+        return {
+            "files": len(assets),
+            "bytes": sum(len(asset.bodies["identity"]) for asset in assets),
+            "gzip_bytes": sum(len(asset.bodies.get("gzip", asset.bodies["identity"])) for asset in assets),
+            "br_bytes": sum(len(asset.bodies.get("br", asset.bodies["identity"])) for asset in assets),
+            "not_modified": self.not_modified,
+        }
+
+    async def __call__(self, scope, receive, send):
+        self._ensure_loaded()
+        if scope["method"] not in ("GET", "HEAD"):
+            await self._send(send, 405, [(b"allow", b"GET, HEAD")], b"Method Not Allowed")
+            return
+        asset, immutable = self.resolve(_route_path(scope))
+        if asset is None:
+            await self._send(send, 404, [(b"content-type", b"text/plain; charset=utf-8")], b"Not Found")
+            return
+
+        codings = accepted_codings(_header(scope, b"accept-encoding"))
+        coding, best_quality = "identity", 0.0
+        for candidate in CONTENT_CODINGS:
+            quality = codings.get(candidate, codings.get("*", 0.0))
+            if candidate in asset.bodies and quality > best_quality:
+                coding, best_quality = candidate, quality
+        etag = asset.etag(coding)
+        headers = [
+            (b"etag", etag.encode("latin-1")),
+            (b"cache-control", (IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL).encode("latin-1")),
+        ]
+        if len(asset.bodies) > 1:
+            headers.append((b"vary", b"Accept-Encoding"))
+
+        if etag_matches(_header(scope, b"if-none-match"), etag):
+            self.not_modified += 1
+            await self._send(send, 304, headers, b"")
+            return
+
+        body = asset.bodies[coding]
+        headers.append((b"content-type", asset.media_type.encode("latin-1")))
+        if coding != "identity":
+            headers.append((b"content-encoding", coding.encode("latin-1")))
+        await self._send(send, 200, headers, body if scope["method"] == "GET" else b"", content_length=len(body))
+
+    @staticmethod
+    async def _send(send, status, headers, body, content_length=None):
+        if status != 304:
+            length = len(body) if content_length is None else content_length
+            headers = headers + [(b"content-length", str(length).encode("latin-1"))]
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+
+def add_asset_helper(templates, stores):
+    # {{ asset_url('mate_static', 'mate.js') }} -> /mate/static/mate.3f2a9c1d7e0b.js
+    templates.env.globals["asset_url"] = lambda name, path: stores[name].url(path)
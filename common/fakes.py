@@ -0,0 +1,72 @@
+# common/fakes.py
+import asyncio
+import os
+import random
+import time
+from contextvars import ContextVar
+
+# Set to a dict by a load test to collect seconds spent in each fake provider
+# for the request being handled; tasks and threads started by the request
+# inherit it
+provider_timings = ContextVar("provider_timings", default=None)
+
+
+class FakeProviderError(Exception):
+    pass
+
+
+def use_fake_providers():
+    # APP_PROVIDERS=fake swaps Gemini, Google TTS, Perplexity and the embedding
+    # model for local stand-ins, so the app runs without credentials or network
+    return os.getenv("APP_PROVIDERS", "real").lower() == "fake"
+
+
+class FakeBehavior:
+    """Latency and failure profile of one fake provider.
+
+    Read from FAKE_<NAME>_LATENCY_MS, FAKE_<NAME>_JITTER_MS and
+    FAKE_<NAME>_FAILURE_RATE, falling back to the given defaults. With
+    FAKE_PROVIDERS_BLOCKING=1 awaited calls block the event loop instead,
+    as the synchronous SDK clients did; benchmarks use it as a baseline.
+    """
+
+    def __init__(self, name, latency_ms, jitter_ms=0.0, failure_rate=0.0):
+        prefix = f"FAKE_{name.upper()}_"
+        self.name = name
+        self.latency_ms = float(os.getenv(prefix + "LATENCY_MS", latency_ms))
+        self.jitter_ms = float(os.getenv(prefix + "JITTER_MS", jitter_ms))
+        self.failure_rate = float(os.getenv(prefix + "FAILURE_RATE", failure_rate))
+        self.blocking = os.getenv("FAKE_PROVIDERS_BLOCKING", "0") == "1"
+        self.calls = 0
+        self.failures = 0
+
+    def delay_seconds(self, scale=1.0):
+        jitter = random.uniform(-self.jitter_ms, self.jitter_ms)
+        return max(0.0, self.latency_ms * scale + jitter) / 1000
+
+    def check_failure(self):
+        self.calls += 1
+        if random.random() < self.failure_rate:
+            self.failures += 1
+            raise FakeProviderError(f"Injected {self.name} failure")
+
+    def record(self, seconds):
+        timings = provider_timings.get()
+        if timings is not None:
+            timings[self.name] = timings.get(self.name, 0.0) + seconds
+
+    async def call(self, scale=1.0):
+        # One simulated round trip: wait, then fail at the configured rate
+        if self.blocking:
+            self.call_blocking(scale)
+            return
+        start = time.perf_counter()
+        await asyncio.sleep(self.delay_seconds(scale))
+        self.record(time.perf_counter() - start)
+        self.check_failure()
+
+    def call_blocking(self, scale=1.0):
+        start = time.perf_counter()
+        time.sleep(self.delay_seconds(scale))
+        self.record(time.perf_counter() - start)
+        self.check_failure()
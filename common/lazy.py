@@ -0,0 +1,65 @@
+# common/lazy.py
+import logging
+import resource
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def current_rss_bytes():
+    # Resident set size of this process; falls back to the peak where /proc is unavailable
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class Lazy:
+    """An expensive object built on first use, at most once, from any thread.
+
+    Every instance is registered so startup profiling can report how long
+    each initializer took and how much memory it added.
+    """
+
+    registry = []
+
+    def __init__(self, name, factory):
+        self.name = name
+        self._factory = factory
+        self._value = None
+        self._built = False
+        self._lock = threading.Lock()
+        self.init_seconds = None
+        self.init_rss_bytes = None
+        Lazy.registry.append(self)
+
+    @property
+    def built(self):
+        return self._built
+
+    def get(self):
+        if self._built:
+            return self._value
+        with self._lock:
+            if not self._built:
+                rss_before = current_rss_bytes()
+                start = time.perf_counter()
+                self._value = self._factory()
+                self.init_seconds = time.perf_counter() - start
+                self.init_rss_bytes = current_rss_bytes() - rss_before
+                self._built = True
+                logger.info(
+                    f"Initialized {self.name} in {self.init_seconds:.2f}s "
+                    f"(+{self.init_rss_bytes / 1024 / 1024:.1f} MB RSS)"
+                )
+        return self._value
+
+    @classmethod
+    def report(cls):
+        return [
+            {"name": lazy.name, "seconds": lazy.init_seconds, "rss_bytes": lazy.init_rss_bytes}
+            for lazy in cls.registry
+            if lazy.built
+        ]
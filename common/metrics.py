@@ -0,0 +1,256 @@
+# common/metrics.py
+#
+# In-process metrics with Prometheus text exposition, timing spans and
+# Server-Timing headers. Deliberately small: one lock per metric and a
+# bisect per observation, so it can stay on in production.
+import bisect
+import os
+import threading
+import time
+from contextvars import ContextVar
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+
+# Seconds; covers cache hits (sub-millisecond) up to slow provider calls
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# Finished spans of the request being handled, for its Server-Timing header
+request_spans = ContextVar("request_spans", default=None)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(label_names, label_values):
+    if not label_names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(label_names, label_values))
+    return "{" + pairs + "}"
+
+
+class Counter:
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self, kind="counter"):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {kind}"]
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_label_text(self.label_names, label_values)} {value}")
+        return lines
+
+
+class Gauge(Counter):
+    def dec(self, *label_values):
+        self.inc(*label_values, amount=-1)
+
+    def render(self):
+        return super().render(kind="gauge")
+
+
+class Histogram:
+    def __init__(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [bucket counts..., count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, seconds, *label_values):
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += 1
+            series[-1] += seconds
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for label_values, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, series):
+                    cumulative += count
+                    labels = _label_text(self.label_names + ("le",), label_values + (bound,))
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _label_text(self.label_names + ("le",), label_values + ("+Inf",))
+                lines.append(f"{self.name}_bucket{labels} {series[-2]}")
+                labels = _label_text(self.label_names, label_values)
+                lines.append(f"{self.name}_count{labels} {series[-2]}")
+                lines.append(f"{self.name}_sum{labels} {series[-1]}")
+        return lines
+
+
+http_request_seconds = Histogram(
+    "http_request_duration_seconds", "HTTP request latency until the response is complete", ("route", "method", "status")
+)
+http_requests_in_flight = Gauge("http_requests_in_flight", "HTTP requests being handled", ("prefix",))
+stage_seconds = Histogram("stage_duration_seconds", "Time spent in each request stage", ("stage",))
+stage_errors = Counter("stage_errors_total", "Stages that ended with an exception", ("stage",))
+provider_seconds = Histogram("provider_call_duration_seconds", "Latency of calls to external providers", ("provider",))
+provider_errors = Counter("provider_errors_total", "Failed calls to external providers", ("provider",))
+provider_in_flight = Gauge("provider_calls_in_flight", "Calls to external providers in progress", ("provider",))
+
+METRICS = [
+    http_request_seconds,
+    http_requests_in_flight,
+    stage_seconds,
+    stage_errors,
+    provider_seconds,
+    provider_errors,
+    provider_in_flight,
+]
+
+
+class Span:
+    """Times one stage of a request, or one call to an external provider.
+
+    Records the stage (or provider) histogram and error counter, and adds
+    the timing to the current request's Server-Timing header.
+    """
+
+    __slots__ = ("name", "provider", "_start")
+
+    def __init__(self, name, provider=False):
+        self.name = name
+        self.provider = provider
+
+    def __enter__(self):
+        if self.provider and METRICS_ENABLED:
+            provider_in_flight.inc(self.name)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if not METRICS_ENABLED:
+            return False
+        elapsed = time.perf_counter() - self._start
+        if self.provider:
+            provider_in_flight.dec(self.name)
+            provider_seconds.observe(elapsed, self.name)
+            if exc_type is not None:
+                provider_errors.inc(self.name)
+        else:
+            stage_seconds.observe(elapsed, self.name)
+            if exc_type is not None:
+                stage_errors.inc(self.name)
+        spans = request_spans.get()
+        if spans is not None:
+            spans.append((self.name, elapsed))
+        return False
+
+
+def span(stage):
+    # with span("frame_prepare"): ...
+    return Span(stage)
+
+
+def provider_call(provider):
+    # with provider_call("gemini"): ...
+    return Span(provider, provider=True)
+
+
+def render_metrics():
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def server_timing(spans, total):
+    # Repeated stages (one TTS call per sentence) are summed into one entry
+    durations = {}
+    for name, seconds in spans:
+        durations[name] = durations.get(name, 0.0) + seconds
+    entries = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in durations.items()]
+    entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
+
+
+def _router_prefix(route, path):
+    # Routers included with a prefix may report their routes without it
+    # (/ for both /mate/ and /visionary/), so the prefix is recovered as the
+    # part of the path in front of what the route's own pattern matches
+    regex = getattr(route, "path_regex", None)
+    if regex is None or regex.match(path):
+        return ""
+    index = path.find("/", 1)
+    while index != -1:
+        if regex.match(path[index:]):
+            return path[:index]
+        index = path.find("/", index + 1)
+    return ""
+
+
+def _route_name(scope):
+    # The templated path as requested, e.g. /mate/jobs/{job_id}, so the
+    # label stays bounded while routes of different routers stay apart
+    root_path = scope.get("root_path", "")
+    route = scope.get("route")
+    template = getattr(route, "path_format", None) or getattr(route, "path", None)
+    if template:
+        path = scope["path"]
+        if root_path and path.startswith(root_path):
+            path = path[len(root_path):]
+        return root_path + _router_prefix(route, path) + template
+    if root_path != scope.get("app_root_path", root_path):
+        # Mounted apps, such as the static asset stores
+        return root_path + "/{path}"
+    endpoint = scope.get("endpoint")
+    return getattr(endpoint, "__name__", "other")
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency and in-flight counts per
+    route, and adding a Server-Timing header with the stages finished before
+    the response started (for streamed responses, the stages before the
+    first byte)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        spans = []
+        token = request_spans.set(spans)
+        start = time.perf_counter()
+        status = 500
+        route = None
+
+        async def send_with_timing(message):
+            nonlocal status, route
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                route = _route_name(scope)
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", server_timing(spans, time.perf_counter() - start).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        # The route is only known after routing, so in-flight is counted per path prefix
+        area = "/" + scope["path"].strip("/").split("/", 1)[0]
+        http_requests_in_flight.inc(area)
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            http_requests_in_flight.dec(area)
+            http_request_seconds.observe(
+                time.perf_counter() - start, route or _route_name(scope), scope["method"], str(status)
+            )
+            request_spans.reset(token)
@@ -0,0 +1,129 @@
+# common/shared_state.py
+#
+# State shared by every worker process on this machine, so the app can run
+# under several uvicorn workers: a SQLite database in WAL mode for small
+# records (versions, cache entries, media and job metadata) and advisory
+# file locks for on-disk data that several workers write.
+import fcntl
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from common.lazy import Lazy
+
+root_dir = Path(__file__).resolve().parent.parent
+
+
+class SharedState:
+    """Namespaced key/value records with optional expiry, plus named version counters."""
+
+    def __init__(self, path):
+        self.path = str(path)
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        connection = self._connect()
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS records ("
+            "namespace TEXT, key TEXT, value TEXT, expires_at REAL, PRIMARY KEY (namespace, key))"
+        )
+        connection.execute("CREATE TABLE IF NOT EXISTS versions (name TEXT PRIMARY KEY, version INTEGER)")
+
+    def _connect(self):
+        # One connection per thread; WAL lets readers run alongside a writer
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def get(self, namespace, key):
+        row = self._connect().execute(
+            "SELECT value, expires_at FROM records WHERE namespace = ? AND key = ?", (namespace, key)
+        ).fetchone()
+        if row is None or (row[1] is not None and row[1] <= time.time()):
+            return None
+        return row[0]
+
+    def put(self, namespace, key, value, ttl_seconds=None):
+        expires_at = time.time() + ttl_seconds if ttl_seconds is not None else None
+        self._connect().execute(
+            "INSERT OR REPLACE INTO records (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+            (namespace, key, value, expires_at),
+        )
+
+    def delete(self, namespace, key):
+        self._connect().execute("DELETE FROM records WHERE namespace = ? AND key = ?", (namespace, key))
+
+    def count(self, namespace):
+        return self._connect().execute(
+            "SELECT COUNT(*) FROM records WHERE namespace = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (namespace, time.time()),
+        ).fetchone()[0]
+
+    def expired(self, namespace):
+        # Keys whose records have expired, so callers can clean up what they point to
+        rows = self._connect().execute(
+            "SELECT key FROM records WHERE namespace = ? AND expires_at <= ?", (namespace, time.time())
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def purge_expired(self):
+        cursor = self._connect().execute("DELETE FROM records WHERE expires_at <= ?", (time.time(),))
+        return cursor.rowcount
+
+    def version(self, name):
+        row = self._connect().execute("SELECT version FROM versions WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else 0
+
+    def bump_version(self, name):
+        connection = self._connect()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute(
+                "INSERT INTO versions (name, version) VALUES (?, 1) "
+                "ON CONFLICT (name) DO UPDATE SET version = version + 1",
+                (name,),
+            )
+            version = connection.execute("SELECT version FROM versions WHERE name = ?", (name,)).fetchone()[0]
+            connection.execute("COMMIT")
+            return version
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+
+@contextmanager
+def file_lock(path, shared=False):
+    # Advisory lock held across processes; shared for readers, exclusive for writers
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def shared_state_path():
+    # None when APP_SHARED_STATE=0: every worker then keeps its state to itself
+    if os.getenv("APP_SHARED_STATE", "1") != "1":
+        return None
+    return os.getenv("APP_STATE_DB", str(root_dir / "storage" / "state.db"))
+
+
+def build_shared_state():
+    path = shared_state_path()
+    return SharedState(path) if path else None
+
+
+shared_state = Lazy("shared_state", build_shared_state)
+
+
+def resolve_state(state):
+    # Stores created at import take the lazy shared_state and build it on first use
+    return state.get() if isinstance(state, Lazy) else state
@@ -1,25 +1,34 @@
 import os
+import asyncio
 from fastapi import FastAPI, Request
-from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from starlette.middleware.cors import CORSMiddleware
-from starlette.responses import HTMLResponse
-from fastapi.responses import FileResponse
+from starlette.responses import HTMLResponse, PlainTextResponse
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+from common.assets import AssetStore, add_asset_helper
+from common.metrics import MetricsMiddleware, render_metrics
+
 # Import routers
-from multimodal_mate.mate import mate_router, set_templates as set_mate_templates
-from visionary.visionary import visionary_router, set_templates as set_visionary_templates
+from multimodal_mate.mate import mate_router, set_templates as set_mate_templates, warm_up as warm_up_mate
+from visionary.visionary import visionary_router, set_templates as set_visionary_templates, warm_up as warm_up_visionary
 
 app = FastAPI()
 
-# Mount static files
-app.mount("/static", StaticFiles(directory="static"), name="static")
-app.mount("/mate/static", StaticFiles(directory="multimodal_mate/static"), name="mate_static")
-app.mount("/visionary/static", StaticFiles(directory="visionary/static"), name="visionary_static")
+# Static files, served from memory with precompressed variants. Templates
+# link to them with asset_url(), which adds a content hash to the file name
+# so browsers can cache them until the file changes.
+precompress_assets = os.getenv("ASSETS_PRECOMPRESS", "1") == "1"
+static_assets = {
+    "static": AssetStore("static", "/static", precompress_assets),
+    "mate_static": AssetStore("multimodal_mate/static", "/mate/static", precompress_assets),
+    "visionary_static": AssetStore("visionary/static", "/visionary/static", precompress_assets),
+}
+for name, store in static_assets.items():
+    app.mount(store.url_prefix, store, name=name)
 
 # Templates directory for the main app
 main_templates = Jinja2Templates(directory="templates")
@@ -31,6 +40,9 @@ mate_templates.env.loader.searchpath.append("templates")  # Add root templates d
 visionary_templates = Jinja2Templates(directory="visionary/templates")
 visionary_templates.env.loader.searchpath.append("templates")  # Add root templates directory
 
+for templates in (main_templates, mate_templates, visionary_templates):
+    add_asset_helper(templates, static_assets)
+
 # Set the templates for both routers
 set_mate_templates(mate_templates)
 set_visionary_templates(visionary_templates)
@@ -43,29 +55,35 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Request latency, in-flight counts and Server-Timing headers; see GET /metrics
+app.add_middleware(MetricsMiddleware)
+
+@app.on_event("startup")
+async def load_static_assets():
+    for store in static_assets.values():
+        await asyncio.to_thread(store.load)
+
+# Models and provider clients are built on first use; set APP_WARM_UP=1 to
+# build them during startup instead, before the worker takes traffic
+@app.on_event("startup")
+async def warm_up():
+    if os.getenv("APP_WARM_UP") == "1":
+        await warm_up_mate()
+        await warm_up_visionary()
 
 # Homepage route
 @app.get("/", response_class=HTMLResponse)
 async def read_home(request: Request):
     return main_templates.TemplateResponse("index.html", {"request": request})
 
+@app.get("/metrics")
+async def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 # Include routers
 app.include_router(mate_router, prefix="/mate")
 app.include_router(visionary_router, prefix="/visionary")
 
-# Add these functions to generate URLs for static files
-@app.get("/static/{path:path}")
-async def static_files(path: str):
-    return FileResponse(f"static/{path}")
-
-@app.get("/mate/static/{path:path}")
-async def mate_static_files(path: str):
-    return FileResponse(f"multimodal_mate/static/{path}")
-
-@app.get("/visionary/static/{path:path}")
-async def visionary_static_files(path: str):
-    return FileResponse(f"visionary/static/{path}")
-
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
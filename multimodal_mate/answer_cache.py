@@ -0,0 +1,69 @@
+# multimodal_mate/answer_cache.py
+import math
+import threading
+import time
+from collections import OrderedDict
+
+
+def cosine_similarity(a, b):
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+class AnswerCache:
+    """Recent RAG answers, matched by question embedding similarity.
+
+    Entries belong to one index and one index version; once the index
+    changes, lookups drop every entry recorded against an older version.
+    """
+
+    def __init__(self, similarity_threshold=0.95, ttl_seconds=600, max_entries=1000):
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # (index key, entry id) -> (version, vector, answer, expires_at)
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def lookup(self, index_key, version, vector):
+        now = time.time()
+        with self._lock:
+            best_key, best_score = None, self.similarity_threshold
+            for key, (entry_version, entry_vector, _, expires_at) in list(self._entries.items()):
+                if key[0] != index_key:
+                    continue
+                if entry_version != version or expires_at <= now:
+                    del self._entries[key]
+                    self.invalidations += 1
+                    continue
+                score = cosine_similarity(vector, entry_vector)
+                if score >= best_score:
+                    best_key, best_score = key, score
+            if best_key is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best_key)
+            self.hits += 1
+            return self._entries[best_key][2]
+
+    def store(self, index_key, version, vector, answer):
+        with self._lock:
+            self._next_id += 1
+            self._entries[(index_key, self._next_id)] = (version, list(vector), answer, time.time() + self.ttl_seconds)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,187 @@
+# multimodal_mate/embedding_service.py
+import asyncio
+import hashlib
+import itertools
+import logging
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.bridge.pydantic import PrivateAttr
+
+from common.metrics import span
+
+logger = logging.getLogger(__name__)
+
+# Queries are waited on by a user, so they are batched ahead of document chunks
+QUERY_PRIORITY = 0
+BULK_PRIORITY = 1
+# Sorts after every real request
+STOP_PRIORITY = 2
+
+
+def text_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingService:
+    """Embeds text in micro-batches on worker threads, with a vector cache keyed by text hash.
+
+    Requests from concurrent uploads and queries share the same queue, so
+    they are coalesced into batches of up to max_batch_size, waiting at most
+    max_wait_ms for a batch to fill. Queries go ahead of queued document
+    chunks, so a chat is not held up by a large ingest. all-MiniLM-L6-v2 has
+    no query instruction, so queries and chunks are embedded the same way.
+    """
+
+    def __init__(self, model, max_batch_size=64, max_wait_ms=5, workers=1, cache_size=100_000):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_ms / 1000
+        self.cache_size = cache_size
+        self._queue = queue.PriorityQueue()  # (priority, sequence, request)
+        self._sequence = itertools.count()
+        self._cache = OrderedDict()   # text hash -> vector
+        self._inflight = {}           # text hash -> Future shared by identical requests
+        self._lock = threading.Lock()
+        self._free_workers = threading.Semaphore(workers)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="embedding")
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.batches = 0
+        self.batched_texts = 0
+        self._dispatcher = threading.Thread(target=self._dispatch, name="embedding-dispatcher", daemon=True)
+        self._dispatcher.start()
+
+    def submit(self, texts, priority=BULK_PRIORITY):
+        # Returns one Future per text; safe to call from any thread
+        futures = []
+        with self._lock:
+            for text in texts:
+                digest = text_hash(text)
+                vector = self._cache.get(digest)
+                if vector is not None:
+                    self._cache.move_to_end(digest)
+                    self.cache_hits += 1
+                    future = Future()
+                    future.set_result(vector)
+                elif digest in self._inflight:
+                    self.cache_hits += 1
+                    future = self._inflight[digest]
+                else:
+                    self.cache_misses += 1
+                    future = Future()
+                    self._inflight[digest] = future
+                    self._queue.put((priority, next(self._sequence), (digest, text, future)))
+                futures.append(future)
+        return futures
+
+    def embed(self, texts, priority=BULK_PRIORITY):
+        # Blocking; call from a worker thread, not the event loop
+        return [future.result() for future in self.submit(texts, priority)]
+
+    async def aembed(self, texts, priority=BULK_PRIORITY):
+        return await asyncio.gather(*(asyncio.wrap_future(future) for future in self.submit(texts, priority)))
+
+    def _stop(self):
+        self._queue.put((STOP_PRIORITY, next(self._sequence), None))
+
+    def _dispatch(self):
+        while True:
+            # Wait for a free worker first, so requests pile up into a bigger
+            # batch while all workers are busy
+            self._free_workers.acquire()
+            first = self._queue.get()[2]
+            if first is None:
+                return
+            batch = [first]
+            deadline = time.monotonic() + self.max_wait_seconds
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - time.monotonic()
+                try:
+                    item = (self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait())[2]
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._stop()
+                    break
+                batch.append(item)
+            self._pool.submit(self._run_batch, batch)
+
+    def close(self):
+        self._stop()
+        self._dispatcher.join()
+        self._pool.shutdown(wait=True)
+
+    def _run_batch(self, batch):
+        try:
+            with span("embed_batch"):
+                vectors = self.model.get_text_embedding_batch([text for _, text, _ in batch])
+        except Exception as e:
+            logger.error(f"Embedding batch of {len(batch)} failed: {str(e)}")
+            with self._lock:
+                for digest, _, _ in batch:
+                    self._inflight.pop(digest, None)
+            for _, _, future in batch:
+                future.set_exception(e)
+            return
+        finally:
+            self._free_workers.release()
+
+        with self._lock:
+            self.batches += 1
+            self.batched_texts += len(batch)
+            for (digest, _, _), vector in zip(batch, vectors):
+                self._inflight.pop(digest, None)
+                if self.cache_size:
+                    self._cache[digest] = vector
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        for (_, _, future), vector in zip(batch, vectors):
+            future.set_result(vector)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.cache_hits + self.cache_misses
+            return {
+                "cached_vectors": len(self._cache),
+                "cache_hits": self.cache_hits,
+                "cache_misses": self.cache_misses,
+                "cache_hit_rate": self.cache_hits / lookups if lookups else 0.0,
+                "batches": self.batches,
+                "avg_batch_size": self.batched_texts / self.batches if self.batches else 0.0,
+                "queued": self._queue.qsize(),
+            }
+
+
+class BatchedEmbedding(BaseEmbedding):
+    """llama_index embedding that routes every call through an EmbeddingService."""
+
+    _service: EmbeddingService = PrivateAttr()
+
+    def __init__(self, service, **kwargs):
+        # The service does its own batching, so llama_index hands over everything at once
+        super().__init__(model_name=f"batched:{service.model.model_name}", embed_batch_size=2048, **kwargs)
+        self._service = service
+
+    @classmethod
+    def class_name(cls):
+        return "BatchedEmbedding"
+
+    def _get_query_embedding(self, query):
+        return self._service.embed([query], QUERY_PRIORITY)[0]
+
+    async def _aget_query_embedding(self, query):
+        return (await self._service.aembed([query], QUERY_PRIORITY))[0]
+
+    def _get_text_embedding(self, text):
+        return self._service.embed([text])[0]
+
+    async def _aget_text_embedding(self, text):
+        return (await self._service.aembed([text]))[0]
+
+    def _get_text_embeddings(self, texts):
+        return self._service.embed(texts)
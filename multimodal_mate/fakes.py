@@ -0,0 +1,105 @@
+# multimodal_mate/fakes.py
+#
+# Local stand-ins for the Gemini model, the llama_index LLM and the MiniLM
+# embedding model, used when APP_PROVIDERS=fake. Latency and failures come
+# from common.fakes.FakeBehavior.
+import hashlib
+import math
+import re
+from types import SimpleNamespace
+
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.llms import CompletionResponse, CustomLLM, LLMMetadata
+from llama_index.core.llms.callbacks import llm_completion_callback
+
+from common.fakes import FakeBehavior
+
+FAKE_ANSWER = "Based on the uploaded documents, the report covers quarterly results, methods and a summary of findings."
+EMBED_DIM = 384
+
+
+class FakeGeminiFlash:
+    """Blocking generate_content, like the google.generativeai model mate.py uses."""
+
+    def __init__(self):
+        self.behavior = FakeBehavior("gemini", latency_ms=800, jitter_ms=200)
+
+    def generate_content(self, prompt):
+        self.behavior.call_blocking()
+        return SimpleNamespace(text=FAKE_ANSWER)
+
+
+class FakeLLM(CustomLLM):
+    """llama_index LLM answering every prompt with a fixed text after FAKE_LLM_LATENCY_MS."""
+
+    _behavior: FakeBehavior = PrivateAttr()
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._behavior = FakeBehavior("llm", latency_ms=1000, jitter_ms=200)
+
+    @property
+    def metadata(self):
+        return LLMMetadata(model_name="fake-llm")
+
+    @llm_completion_callback()
+    def complete(self, prompt, formatted=False, **kwargs):
+        self._behavior.call_blocking()
+        return CompletionResponse(text=FAKE_ANSWER)
+
+    @llm_completion_callback()
+    def stream_complete(self, prompt, formatted=False, **kwargs):
+        self._behavior.call_blocking()
+
+        def gen():
+            text = ""
+            for word in FAKE_ANSWER.split(" "):
+                delta = word if not text else " " + word
+                text += delta
+                yield CompletionResponse(text=text, delta=delta)
+
+        return gen()
+
+
+class FakeEmbedding(BaseEmbedding):
+    """Hashed bag-of-words vectors: texts sharing most of their words are
+    close, so rephrased questions can hit the answer cache as with a real
+    model, while unrelated texts are nearly orthogonal. Word order and
+    meaning are ignored. FAKE_EMBED_LATENCY_MS is per 32 texts."""
+
+    _behavior: FakeBehavior = PrivateAttr()
+
+    def __init__(self, **kwargs):
+        super().__init__(model_name="fake-embedding", **kwargs)
+        self._behavior = FakeBehavior("embed", latency_ms=40, jitter_ms=10)
+
+    @classmethod
+    def class_name(cls):
+        return "FakeEmbedding"
+
+    @staticmethod
+    def _vector(text):
+        # Each word adds +-1 to one hashed dimension; the result is unit length
+        vector = [0.0] * EMBED_DIM
+        for word in re.findall(r"\w+", text.casefold()):
+            digest = hashlib.sha256(word.encode("utf-8")).digest()
+            index = int.from_bytes(digest[:4], "big") % EMBED_DIM
+            vector[index] += 1.0 if digest[4] & 1 else -1.0
+        norm = math.sqrt(sum(value * value for value in vector))
+        if not norm:
+            vector[0] = norm = 1.0
+        return [value / norm for value in vector]
+
+    def _get_text_embeddings(self, texts):
+        self._behavior.call_blocking(scale=max(1, len(texts)) / 32)
+        return [self._vector(text) for text in texts]
+
+    def _get_text_embedding(self, text):
+        return self._get_text_embeddings([text])[0]
+
+    def _get_query_embedding(self, query):
+        return self._get_text_embedding(query)
+
+    async def _aget_query_embedding(self, query):
+        return self._get_query_embedding(query)
@@ -0,0 +1,79 @@
+# multimodal_mate/index_manager.py
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from common.shared_state import resolve_state
+from multimodal_mate.index_store import PersistentIndex
+
+logger = logging.getLogger(__name__)
+
+
+class IndexManager:
+    """Per-session document indexes kept within a total memory budget.
+
+    Least recently used indexes are unloaded when the budget is exceeded;
+    they stay on disk and are reloaded the next time their session uses them.
+    """
+
+    def __init__(self, root_dir, memory_budget_bytes, state=None):
+        self.root_dir = Path(root_dir)
+        self.memory_budget_bytes = memory_budget_bytes
+        self._state = state  # SharedState, None, or the lazy shared_state
+        self._indexes = OrderedDict()  # session id -> PersistentIndex, least recently used first
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    @property
+    def state(self):
+        return resolve_state(self._state)
+
+    def _session_dir(self, session_id):
+        # Session ids come from clients, so they are hashed rather than used as paths
+        digest = hashlib.sha256(session_id.encode("utf-8")).hexdigest()[:32]
+        return self.root_dir / digest
+
+    def get(self, session_id):
+        with self._lock:
+            document_index = self._indexes.get(session_id)
+            if document_index is None:
+                document_index = PersistentIndex(self._session_dir(session_id), state=self.state)
+                self._indexes[session_id] = document_index
+            self._indexes.move_to_end(session_id)
+        return document_index
+
+    def enforce_budget(self):
+        # Call after an index was loaded or grew; never evicts the most recent one
+        with self._lock:
+            resident = [(session_id, index) for session_id, index in self._indexes.items() if index.is_loaded]
+            total = sum(index.memory_bytes for _, index in resident)
+            victims = []
+            for session_id, document_index in resident[:-1]:
+                if total <= self.memory_budget_bytes:
+                    break
+                total -= document_index.memory_bytes
+                victims.append((session_id, document_index))
+            self.evictions += len(victims)
+        for session_id, document_index in victims:
+            document_index.unload()
+            logger.info(f"Evicted index for session {session_id[:8]} to disk")
+
+    def stats(self):
+        with self._lock:
+            indexes = list(self._indexes.values())
+            evictions = self.evictions
+        resident = [index for index in indexes if index.is_loaded]
+        loads = sum(index.load_count for index in indexes)
+        load_seconds = sum(index.load_seconds for index in indexes)
+        return {
+            "sessions": len(indexes),
+            "resident_indexes": len(resident),
+            "resident_bytes": sum(index.memory_bytes for index in resident),
+            "memory_budget_bytes": self.memory_budget_bytes,
+            "evictions": evictions,
+            "reloads": loads,
+            "avg_reload_ms": load_seconds / loads * 1000 if loads else 0.0,
+            "max_reload_ms": max((index.max_load_seconds for index in indexes), default=0.0) * 1000,
+        }
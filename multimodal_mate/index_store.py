@@ -0,0 +1,299 @@
+# multimodal_mate/index_store.py
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import nullcontext
+from pathlib import Path
+
+from llama_index.core import Settings, StorageContext, VectorStoreIndex, load_index_from_storage
+from llama_index.core.schema import MetadataMode
+
+from common.shared_state import file_lock
+
+logger = logging.getLogger(__name__)
+
+HASHES_FILE = "content_hashes.json"
+LOCK_FILE = ".lock"
+
+# SimpleVectorStore keeps embeddings as Python lists of floats: an 8 byte
+# pointer plus a 24 byte float object per dimension
+BYTES_PER_EMBEDDING_VALUE = 32
+
+
+def content_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def source_of(ref_doc_id):
+    # Documents are ids of the form "<filename>#<page>"; the filename is their source
+    return ref_doc_id.rsplit("#", 1)[0]
+
+
+class PersistentIndex:
+    """A vector index persisted to disk that grows by incremental inserts.
+
+    Chunks whose text was already embedded are skipped, so re-uploading a
+    document only embeds what changed. A chunk shared by several documents
+    is stored once and kept until the last of them is deleted. The index is
+    loaded on first use.
+
+    With a SharedState, several worker processes can serve the same index:
+    its version lives in the shared state, writers hold a file lock, and a
+    worker reloads its copy when another worker has changed the index.
+    """
+
+    def __init__(self, persist_dir, state=None):
+        self.persist_dir = Path(persist_dir)
+        self._state = state
+        self._state_key = f"index:{self.persist_dir.name}"
+        self._loaded_version = None
+        self._index = None
+        self._hashes = {}  # chunk content hash -> {"node_id": ..., "owners": [ref doc ids]}
+        self._loaded = False
+        self._lock = threading.RLock()
+        self.memory_bytes = 0
+        self.version = 0              # bumped on every insert or delete
+        self._query_engine = None
+        self._query_engine_version = None
+        self.load_count = 0
+        self.load_seconds = 0.0
+        self.max_load_seconds = 0.0
+
+    def _disk_lock(self, shared=False):
+        if self._state is None:
+            return nullcontext()
+        return file_lock(self.persist_dir / LOCK_FILE, shared=shared)
+
+    def _is_current(self):
+        if not self._loaded:
+            return False
+        return self._state is None or self._state.version(self._state_key) == self._loaded_version
+
+    def _load(self):
+        # For readers; writers call _refresh while holding the exclusive lock,
+        # since a second flock on the same file from this process would wait forever
+        if self._is_current():
+            return
+        with self._disk_lock(shared=True):
+            self._refresh()
+
+    def _refresh(self):
+        # Caller holds self._lock and a file lock (shared or exclusive)
+        if self._is_current():
+            return
+        if self._loaded:
+            logger.info(f"Index in {self.persist_dir} was changed by another worker, reloading")
+            self.unload()
+        if self._state is not None:
+            self._loaded_version = self.version = self._state.version(self._state_key)
+        if (self.persist_dir / "docstore.json").exists():
+            start = time.perf_counter()
+            storage_context = StorageContext.from_defaults(persist_dir=str(self.persist_dir))
+            self._index = load_index_from_storage(storage_context)
+            hashes_path = self.persist_dir / HASHES_FILE
+            if hashes_path.exists():
+                self._hashes = self._read_hashes(json.loads(hashes_path.read_text()))
+            elapsed = time.perf_counter() - start
+            self.load_count += 1
+            self.load_seconds += elapsed
+            self.max_load_seconds = max(self.max_load_seconds, elapsed)
+            logger.info(f"Loaded index from {self.persist_dir} ({len(self._hashes)} chunks)")
+        self._loaded = True
+        self._update_memory_bytes()
+
+    def _read_hashes(self, hashes):
+        # Indexes written before chunks could have several owners map each hash to one ref doc id
+        if all(isinstance(chunk, dict) for chunk in hashes.values()):
+            return hashes
+        node_ids = {content_hash(node.get_content()): node.node_id for node in self._index.docstore.docs.values()}
+        return {
+            digest: {"node_id": node_ids[digest], "owners": [owner]}
+            for digest, owner in hashes.items()
+            if digest in node_ids
+        }
+
+    def _update_memory_bytes(self):
+        # Rough resident size: embedding vectors plus chunk text
+        if self._index is None:
+            self.memory_bytes = 0
+            return
+        vector_data = getattr(self._index.vector_store, "data", None)
+        embeddings = getattr(vector_data, "embedding_dict", {}) or {}
+        vector_bytes = sum(len(vector) for vector in embeddings.values()) * BYTES_PER_EMBEDDING_VALUE
+        text_bytes = sum(len(node.get_content()) for node in self._index.docstore.docs.values())
+        self.memory_bytes = vector_bytes + text_bytes
+
+    @property
+    def is_loaded(self):
+        return self._loaded and self._index is not None
+
+    def unload(self):
+        # Everything is persisted after each change, so dropping it is safe
+        with self._lock:
+            self._index = None
+            self._hashes = {}
+            self._loaded = False
+            self._loaded_version = None
+            self.memory_bytes = 0
+            self._query_engine = None
+
+    def _persist(self):
+        self.persist_dir.mkdir(parents=True, exist_ok=True)
+        self._index.storage_context.persist(persist_dir=str(self.persist_dir))
+        tmp_path = self.persist_dir / f"{HASHES_FILE}.tmp"
+        tmp_path.write_text(json.dumps(self._hashes))
+        os.replace(tmp_path, self.persist_dir / HASHES_FILE)
+        # Bumped only once the files are complete, so other workers reload a finished index
+        if self._state is not None:
+            self._loaded_version = self.version = self._state.bump_version(self._state_key)
+        else:
+            self.version += 1
+
+    def get(self):
+        # Returns the loaded index, or None if nothing has been indexed yet
+        with self._lock:
+            self._load()
+            return self._index
+
+    def query_engine(self):
+        # Built once per index version and reused until the index changes
+        with self._lock:
+            self._load()
+            if self._index is None:
+                return None
+            if self._query_engine is None or self._query_engine_version != self.version:
+                self._query_engine = self._index.as_query_engine()
+                self._query_engine_version = self.version
+            return self._query_engine
+
+    def has_documents(self):
+        # Cheap check that neither loads the index nor waits for a writer
+        return (self.persist_dir / "docstore.json").exists()
+
+    def insert_documents(self, documents):
+        # Blocking (parsing, embedding, disk writes); call from a worker thread.
+        # Documents keep their id across uploads: an unchanged document is
+        # skipped, a changed one has its old chunks replaced, and pages of the
+        # same source file that are missing from this batch are removed.
+        nodes = Settings.node_parser.get_nodes_from_documents(documents)
+        nodes_by_doc = {document.id_: [] for document in documents}
+        for node in nodes:
+            nodes_by_doc.setdefault(node.ref_doc_id, []).append((content_hash(node.get_content()), node))
+
+        # Embedding is the slow part, so it runs before the locks are taken;
+        # readers and other writers only wait for the insert and the persist
+        with self._lock:
+            self._load()
+            known = set(self._hashes)
+        self._embed([node for node in nodes if content_hash(node.get_content()) not in known])
+
+        with self._lock, self._disk_lock():
+            self._refresh()
+            new_nodes = []
+            changed = False
+            # Grouped once, so a batch of many documents stays linear in the index size
+            hashes_by_doc = {}
+            for digest, chunk in self._hashes.items():
+                for owner in chunk["owners"]:
+                    hashes_by_doc.setdefault(owner, set()).add(digest)
+
+            sources = {source_of(ref_doc_id) for ref_doc_id in nodes_by_doc}
+            for ref_doc_id in hashes_by_doc:
+                if source_of(ref_doc_id) in sources and ref_doc_id not in nodes_by_doc:
+                    self._release(ref_doc_id, hashes_by_doc[ref_doc_id])
+                    changed = True
+
+            for ref_doc_id, doc_nodes in nodes_by_doc.items():
+                existing = hashes_by_doc.get(ref_doc_id, set())
+                digests = {digest for digest, _ in doc_nodes}
+                if existing == digests:
+                    continue
+                self._release(ref_doc_id, existing - digests)
+                for digest, node in doc_nodes:
+                    chunk = self._hashes.get(digest)
+                    if chunk is None:
+                        self._hashes[digest] = {"node_id": node.node_id, "owners": [ref_doc_id]}
+                        new_nodes.append(node)
+                    # Identical chunks from other documents are not embedded twice
+                    elif ref_doc_id not in chunk["owners"]:
+                        chunk["owners"].append(ref_doc_id)
+                changed = True
+
+            orphans = [digest for digest, chunk in self._hashes.items() if not chunk["owners"]]
+            if orphans:
+                self._index.delete_nodes(
+                    [self._hashes.pop(digest)["node_id"] for digest in orphans], delete_from_docstore=True
+                )
+            if new_nodes:
+                # Nodes still without a vector (a chunk another worker removed
+                # meanwhile) are embedded by llama_index here
+                if self._index is None:
+                    self._index = VectorStoreIndex(new_nodes)
+                else:
+                    self._index.insert_nodes(new_nodes)
+            if changed:
+                self._persist()
+                self._update_memory_bytes()
+        return len(new_nodes), len(nodes) - len(new_nodes)
+
+    @staticmethod
+    def _embed(nodes):
+        # One vector per distinct chunk text, computed the way llama_index would
+        texts = {}
+        for node in nodes:
+            texts.setdefault(node.get_content(metadata_mode=MetadataMode.EMBED), []).append(node)
+        if not texts:
+            return
+        embeddings = Settings.embed_model.get_text_embedding_batch(list(texts))
+        for same_text, embedding in zip(texts.values(), embeddings):
+            for node in same_text:
+                node.embedding = embedding
+
+    def _release(self, ref_doc_id, digests):
+        # Chunks left without owners are deleted by the caller, after this
+        # batch had the chance to claim them again
+        for digest in digests:
+            owners = self._hashes[digest]["owners"]
+            if ref_doc_id in owners:
+                owners.remove(ref_doc_id)
+
+    def delete_documents(self, ref_doc_ids):
+        # The locks are only taken when one of the documents is indexed
+        ref_doc_ids = set(ref_doc_ids)
+        if not ref_doc_ids or not ref_doc_ids & set(self.documents()):
+            return 0
+        with self._lock, self._disk_lock():
+            self._refresh()
+            if self._index is None:
+                return 0
+            changed = False
+            orphan_node_ids = []
+            for digest, chunk in list(self._hashes.items()):
+                owners = [owner for owner in chunk["owners"] if owner not in ref_doc_ids]
+                if len(owners) == len(chunk["owners"]):
+                    continue
+                chunk["owners"] = owners
+                changed = True
+                if not owners:
+                    orphan_node_ids.append(chunk["node_id"])
+                    del self._hashes[digest]
+            if not changed:
+                return 0
+            if orphan_node_ids:
+                self._index.delete_nodes(orphan_node_ids, delete_from_docstore=True)
+            self._persist()
+            self._update_memory_bytes()
+            return len(ref_doc_ids)
+
+    def documents(self):
+        # Maps each ref doc id to its number of stored chunks
+        with self._lock:
+            self._load()
+            counts = {}
+            for chunk in self._hashes.values():
+                for ref_doc_id in chunk["owners"]:
+                    counts[ref_doc_id] = counts.get(ref_doc_id, 0) + 1
+            return counts
@@ -0,0 +1,262 @@
+# multimodal_mate/ingest.py
+import asyncio
+import json
+import multiprocessing
+import os
+import secrets
+import tarfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+from common.shared_state import resolve_state
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+JOB_TERMINAL_STATES = ("done", "failed")
+
+# How often a worker checks on a job that another worker is running
+JOB_POLL_SECONDS = 0.5
+
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+async def upload_chunks(upload, chunk_size=UPLOAD_CHUNK_SIZE):
+    while True:
+        chunk = await upload.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+async def save_stream(chunks, path, max_bytes, chunk_size=UPLOAD_CHUNK_SIZE):
+    # Writes an async stream of byte chunks to disk in fixed-size blocks, so
+    # memory use does not grow with the file, and stops as soon as the size
+    # cap is crossed
+    written = 0
+    buffer = bytearray()
+    with open(path, "wb") as target:
+        async for chunk in chunks:
+            written += len(chunk)
+            if written > max_bytes:
+                raise UploadTooLarge(f"File exceeds the {max_bytes // (1024 * 1024)} MB upload limit")
+            buffer += chunk
+            if len(buffer) >= chunk_size:
+                await asyncio.to_thread(target.write, bytes(buffer))
+                buffer.clear()
+        if buffer:
+            await asyncio.to_thread(target.write, bytes(buffer))
+    return written
+
+
+def parse_documents(file_path):
+    # Runs in a worker process; imported lazily so workers start quickly
+    from llama_index.core import SimpleDirectoryReader
+    return SimpleDirectoryReader(input_files=[file_path]).load_data()
+
+
+async def parse_files(pool, file_paths, on_parsed=None):
+    # Parses every file in the pool at once, one task per file. A file that
+    # fails to parse is reported instead of failing the whole batch.
+    loop = asyncio.get_running_loop()
+
+    async def parse(file_path):
+        try:
+            return file_path, await loop.run_in_executor(pool, parse_documents, file_path), None
+        except Exception as e:
+            return file_path, [], e
+
+    documents, failures = {}, {}
+    for finished in asyncio.as_completed([parse(file_path) for file_path in file_paths]):
+        file_path, file_documents, error = await finished
+        if error is None:
+            documents[file_path] = file_documents
+        else:
+            failures[file_path] = str(error)
+        if on_parsed is not None:
+            await on_parsed(len(documents) + len(failures), len(file_paths))
+    return documents, failures
+
+
+def is_archive(filename):
+    return filename.lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def _archive_members(archive_path):
+    # (name, size, open callable) for every regular file in a zip or tar archive
+    if zipfile.is_zipfile(archive_path):
+        archive = zipfile.ZipFile(archive_path)
+        members = [
+            (info.filename, info.file_size, lambda info=info: archive.open(info))
+            for info in archive.infolist()
+            if not info.is_dir()
+        ]
+    else:
+        archive = tarfile.open(archive_path)
+        members = [
+            (info.name, info.size, lambda info=info: archive.extractfile(info))
+            for info in archive.getmembers()
+            if info.isfile()
+        ]
+    return archive, members
+
+
+def extract_archive(archive_path, target_dir, max_bytes):
+    # Blocking. Extracts regular files only, refuses paths that would escape
+    # target_dir and checks the uncompressed size before writing anything.
+    # max_bytes is what is left of the request's upload budget. Returns
+    # (relative name, path) pairs and the number of bytes extracted.
+    archive, members = _archive_members(archive_path)
+    too_large = UploadTooLarge("The uploaded files and archive contents exceed the upload limit")
+    with archive:
+        members = [
+            member for member in members
+            if not any(part.startswith(".") or part == "__MACOSX" for part in member[0].split("/"))
+        ]
+        if sum(size for _, size, _ in members) > max_bytes:
+            raise too_large
+
+        root = os.path.realpath(target_dir)
+        extracted = []
+        written = 0
+        for name, _, open_member in members:
+            path = os.path.realpath(os.path.join(root, name))
+            if not path.startswith(root + os.sep):
+                raise ValueError(f"Archive member {name} is outside the archive root")
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open_member() as source, open(path, "wb") as target:
+                while block := source.read(UPLOAD_CHUNK_SIZE):
+                    # The sizes in an archive's headers are not trusted for the limit
+                    written += len(block)
+                    if written > max_bytes:
+                        raise too_large
+                    target.write(block)
+            extracted.append((os.path.relpath(path, root).replace(os.sep, "/"), path))
+    return extracted, written
+
+
+def create_parse_pool(workers):
+    # spawn, not fork: the parent has live threads (embedding dispatcher, executors)
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+class IngestJob:
+    def __init__(self, job_id, filename, state=None, ttl_seconds=3600):
+        self.job_id = job_id
+        self.filename = filename
+        self.status = "queued"
+        self.detail = None
+        self.result = None
+        self.created = time.time()
+        self.updated = self.created
+        self._changed = asyncio.Condition()
+        self._state = state
+        self._ttl_seconds = ttl_seconds
+
+    def publish(self):
+        # Makes the job visible to the other workers sharing the state database
+        if self._state is not None:
+            self._state.put("jobs", self.job_id, json.dumps(self.to_dict()), self._ttl_seconds)
+
+    def to_dict(self):
+        return {
+            "job_id": self.job_id,
+            "filename": self.filename,
+            "status": self.status,
+            "detail": self.detail,
+            "result": self.result,
+            "elapsed_seconds": round(self.updated - self.created, 3),
+        }
+
+    async def update(self, status, detail=None, result=None):
+        async with self._changed:
+            self.status = status
+            self.detail = detail
+            self.result = result
+            self.updated = time.time()
+            self._changed.notify_all()
+        if self._state is not None:
+            await asyncio.to_thread(self.publish)
+
+    async def changes(self):
+        # Yields the job state now and after every update until it finishes
+        last_seen = None
+        while True:
+            async with self._changed:
+                if self.updated == last_seen:
+                    await self._changed.wait()
+                last_seen = self.updated
+                state = self.to_dict()
+            yield state
+            if state["status"] in JOB_TERMINAL_STATES:
+                return
+
+
+class JobRegistry:
+    """Ingest jobs of this process; finished jobs are forgotten after a TTL.
+
+    With a SharedState, job states are also published there, so any worker
+    can report on a job that another worker is running.
+    """
+
+    def __init__(self, ttl_seconds=3600, state=None):
+        self.ttl_seconds = ttl_seconds
+        self._state = state  # SharedState, None, or the lazy shared_state
+        self._jobs = {}
+
+    @property
+    def state(self):
+        return resolve_state(self._state)
+
+    def create(self, filename):
+        self._evict_finished()
+        job = IngestJob(secrets.token_urlsafe(12), filename, self.state, self.ttl_seconds)
+        job.publish()
+        self._jobs[job.job_id] = job
+        return job
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def snapshot(self, job_id):
+        # Blocking when the job belongs to another worker; call from a worker thread
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return job.to_dict()
+        if self.state is None:
+            return None
+        value = self.state.get("jobs", job_id)
+        return json.loads(value) if value is not None else None
+
+    async def remote_changes(self, job_id):
+        # Like IngestJob.changes for a job running in another worker, by polling
+        last_seen = None
+        while True:
+            state = await asyncio.to_thread(self.snapshot, job_id)
+            if state is None:
+                return
+            if state != last_seen:
+                last_seen = state
+                yield state
+                if state["status"] in JOB_TERMINAL_STATES:
+                    return
+            await asyncio.sleep(JOB_POLL_SECONDS)
+
+    def _evict_finished(self):
+        cutoff = time.time() - self.ttl_seconds
+        for job_id, job in list(self._jobs.items()):
+            if job.status in JOB_TERMINAL_STATES and job.updated < cutoff:
+                del self._jobs[job_id]
+
+
+def max_upload_bytes():
+    return int(os.getenv("MATE_MAX_UPLOAD_BYTES", str(512 * 1024 * 1024)))
+
+
+def max_media_bytes():
+    # Media is sent to the model inline, so it has a lower cap than documents
+    return int(os.getenv("MATE_MAX_MEDIA_BYTES", str(100 * 1024 * 1024)))
@@ -3,134 +3,457 @@ import os
 import mimetypes
 import base64
 import tempfile
+import shutil
+import json
+import tarfile
+import zipfile
 import traceback
 import logging
+import asyncio
+from pathlib import Path
 from fastapi import APIRouter, File, UploadFile, Request, HTTPException
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 import google.generativeai as genai
-from llama_index.core import SimpleDirectoryReader, VectorStoreIndex, Settings
-from llama_index.llms.gemini import Gemini
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+from llama_index.core import Settings
+
+from common.lazy import Lazy
+from common.fakes import use_fake_providers
+from common.metrics import provider_call, span
+from common.shared_state import shared_state
+from multimodal_mate.media_store import MediaStore
+from multimodal_mate.index_manager import IndexManager
+from multimodal_mate.index_store import source_of
+from multimodal_mate.embedding_service import QUERY_PRIORITY, EmbeddingService, BatchedEmbedding
+from multimodal_mate.answer_cache import AnswerCache
+from multimodal_mate.ingest import (
+    JobRegistry, UploadTooLarge, create_parse_pool, extract_archive, is_archive, max_media_bytes, max_upload_bytes,
+    parse_documents, parse_files, save_stream, upload_chunks,
+)
 
 # Initialize logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Load environment variables and set up API key
+# Load environment variables
 load_dotenv()
-GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
-if not GOOGLE_API_KEY:
-    raise ValueError("GOOGLE_API_KEY is not set in the environment variables.")
 
-genai.configure(api_key=GOOGLE_API_KEY)
+# Models are built on first use, so importing this module is cheap and a
+# worker that never serves Mate never loads them
+def get_google_api_key():
+    google_api_key = os.getenv("GOOGLE_API_KEY")
+    if not google_api_key:
+        raise ValueError("GOOGLE_API_KEY is not set in the environment variables.")
+    return google_api_key
+
+def build_gemini_flash():
+    if use_fake_providers():
+        from multimodal_mate.fakes import FakeGeminiFlash
+        return FakeGeminiFlash()
+    genai.configure(api_key=get_google_api_key())
+    return genai.GenerativeModel('models/gemini-1.5-flash')
+
+EMBED_MAX_BATCH_SIZE = int(os.getenv("MATE_EMBED_MAX_BATCH_SIZE", "64"))
+
+def build_embed_model():
+    if use_fake_providers():
+        from multimodal_mate.fakes import FakeEmbedding
+        return FakeEmbedding(embed_batch_size=EMBED_MAX_BATCH_SIZE)
+    # Imported here because it pulls in sentence-transformers and torch
+    from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+    return HuggingFaceEmbedding(
+        model_name="sentence-transformers/all-MiniLM-L6-v2",
+        embed_batch_size=EMBED_MAX_BATCH_SIZE,
+    )
 
-# Initialize models
-gemini_flash = genai.GenerativeModel('models/gemini-1.5-flash')
-embed_model = HuggingFaceEmbedding(model_name="sentence-transformers/all-MiniLM-L6-v2")
-llm = Gemini(model_name="models/gemini-1.5-flash", api_key=GOOGLE_API_KEY)
-Settings.embed_model = embed_model
-Settings.llm = llm
+def build_embedding_service():
+    embed_model = build_embed_model()
+    # Chunks from concurrent uploads and queries are embedded together in micro-batches
+    return EmbeddingService(
+        embed_model,
+        max_batch_size=EMBED_MAX_BATCH_SIZE,
+        max_wait_ms=float(os.getenv("MATE_EMBED_MAX_WAIT_MS", "5")),
+        workers=int(os.getenv("MATE_EMBED_WORKERS", "1")),
+        cache_size=int(os.getenv("MATE_EMBED_CACHE_SIZE", "100000")),
+    )
+
+def configure_llama_index():
+    Settings.embed_model = BatchedEmbedding(embedding_service.get())
+    if use_fake_providers():
+        from multimodal_mate.fakes import FakeLLM
+        Settings.llm = FakeLLM()
+    else:
+        from llama_index.llms.gemini import Gemini
+        Settings.llm = Gemini(model_name="models/gemini-1.5-flash", api_key=get_google_api_key())
+    return Settings
+
+gemini_flash = Lazy("mate.gemini_flash", build_gemini_flash)
+embedding_service = Lazy("mate.embedding_service", build_embedding_service)
+llama_index_settings = Lazy("mate.llama_index_settings", configure_llama_index)
 
 # Initialize the APIRouter
 mate_router = APIRouter()
 mate_templates = None
 
-# Global index variable
-index = None
+root_dir = Path(__file__).resolve().parent.parent
+
+# Document indexes per chat session, persisted to disk and loaded on demand
+# Index versions, job states and media handles go through the shared state,
+# so every uvicorn worker sees the same sessions
+index_manager = IndexManager(
+    root_dir=os.getenv("MATE_INDEX_DIR", str(root_dir / "storage" / "index")),
+    memory_budget_bytes=int(os.getenv("MATE_INDEX_MEMORY_BUDGET_BYTES", str(512 * 1024 * 1024))),
+    state=shared_state,
+)
+
+# Recent RAG answers, reused for near-identical questions until the index changes
+answer_cache = AnswerCache(
+    similarity_threshold=float(os.getenv("MATE_ANSWER_CACHE_THRESHOLD", "0.95")),
+    ttl_seconds=float(os.getenv("MATE_ANSWER_CACHE_TTL_SECONDS", "600")),
+    max_entries=int(os.getenv("MATE_ANSWER_CACHE_SIZE", "1000")),
+)
+
+# Document parsing runs in worker processes, off the event loop
+parse_pool = Lazy("mate.parse_pool", lambda: create_parse_pool(int(os.getenv("MATE_PARSE_WORKERS", "2"))))
+ingest_jobs = JobRegistry(state=shared_state)
+background_tasks = set()
+
+# Uploaded media is kept server-side and referenced by handle in chat requests
+media_store = MediaStore(
+    directory=os.getenv("MATE_MEDIA_DIR", str(root_dir / "cache" / "media")),
+    ttl_seconds=float(os.getenv("MATE_MEDIA_TTL_SECONDS", "3600")),
+    state=shared_state,
+)
 
 class ChatRequest(BaseModel):
     message: str = Field(default="")
     file: str | None = Field(default=None)
+    fileHandle: str | None = Field(default=None)
     fileType: str | None = Field(default=None)
 
 @mate_router.get("/", response_class=HTMLResponse)
 async def mate_home(request: Request):
     return mate_templates.TemplateResponse("mate.html", {"request": request})
 
+def get_session_id(request: Request):
+    # mate.js sends a per-browser id; each session gets its own document index
+    return request.headers.get("x-session-id") or request.cookies.get("mate_session") or "default"
+
+async def load_session_index(session_id):
+    with span("index_load"):
+        await asyncio.to_thread(llama_index_settings.get)
+        document_index = index_manager.get(session_id)
+        index = await asyncio.to_thread(document_index.get)
+        await asyncio.to_thread(index_manager.enforce_budget)
+    return document_index, index
+
 def detect_file_type(filename):
     return mimetypes.guess_type(filename)[0] or "application/octet-stream"
 
+def new_upload_dir():
+    return tempfile.mkdtemp(prefix="mate-upload-")
+
+def document_preview(text):
+    return text[:500] + "..." if len(text) > 500 else text
+
+async def ingest_document(job, session_id, upload_dir, file_path, filename, file_type):
+    # Parse in the process pool, then embed and index in worker threads;
+    # the event loop only waits. The upload directory is removed afterwards.
+    try:
+        await job.update("parsing", f"Parsing {filename}")
+        logger.info(f"Attempting to process file: {filename}")
+        loop = asyncio.get_running_loop()
+        with span("parse"):
+            documents = await loop.run_in_executor(parse_pool.get(), parse_documents, file_path)
+        logger.info(f"Successfully processed file: {filename}")
+
+        if not documents:
+            logger.warning(f"No content extracted from file: {filename}")
+            raise ValueError("No content could be extracted from the file.")
+
+        # Stable ids let a re-upload of the same file replace its previous chunks
+        for page_number, document in enumerate(documents):
+            document.id_ = f"{filename}#{page_number}"
+
+        await job.update("indexing", f"Embedding {len(documents)} pages of {filename}")
+        document_index = index_manager.get(session_id)
+        await asyncio.to_thread(llama_index_settings.get)
+        with span("index_insert"):
+            added, skipped = await asyncio.to_thread(document_index.insert_documents, documents)
+        await asyncio.to_thread(index_manager.enforce_budget)
+        logger.info(f"File processed and indexed successfully: {filename}")
+        logger.info(f"Embedded {added} new chunks, skipped {skipped} already indexed")
+
+        result = {
+            "message": f"{file_type} file processed and indexed successfully",
+            "filename": filename,
+            "content_preview": document_preview(documents[0].text),
+            "chunks_added": added,
+            "chunks_skipped": skipped,
+        }
+        await job.update("done", result=result)
+        return result
+    except Exception as e:
+        await job.update("failed", detail=str(e))
+        raise
+    finally:
+        await asyncio.to_thread(shutil.rmtree, upload_dir, True)
+
 @mate_router.post("/upload")
-async def upload_file(file: UploadFile = File(...)):
-    global index
+async def upload_file(request: Request, file: UploadFile = File(...)):
     try:
-        content = await file.read()
         file_type = detect_file_type(file.filename)
         logger.info(f"Uploading file: {file.filename} (Type: {file_type})")
 
         if file_type.startswith(("image/", "audio/", "video/")):
-            encoded_file = base64.b64encode(content).decode()
-            logger.info(f"Media file processed successfully: {file.filename}")
+            # Keep the bytes server-side; the browser only gets a handle back
+            handle = await asyncio.to_thread(
+                media_store.put_file, file.file, file_type, file.filename, max_media_bytes()
+            )
+            logger.info(f"Media file stored successfully: {file.filename}")
             return JSONResponse(content={
                 "message": f"{file_type} uploaded successfully",
                 "filename": file.filename,
-                "file_data": encoded_file,
+                "handle": handle,
                 "mime_type": file_type
             })
 
-        # Use SimpleDirectoryReader to process document files
-        with tempfile.TemporaryDirectory() as temp_dir:
-            temp_file_path = os.path.join(temp_dir, file.filename)
-            with open(temp_file_path, "wb") as temp_file:
-                temp_file.write(content)
-            
-            logger.info(f"Attempting to process file: {file.filename}")
-            reader = SimpleDirectoryReader(temp_dir)
-            documents = reader.load_data()
-            logger.info(f"Successfully processed file: {file.filename}")
+        # Copy the upload to disk in chunks instead of reading it into memory
+        filename = os.path.basename(file.filename)
+        upload_dir = new_upload_dir()
+        file_path = os.path.join(upload_dir, filename)
+        try:
+            with span("upload_save"):
+                await save_stream(upload_chunks(file), file_path, max_upload_bytes())
+        except Exception:
+            shutil.rmtree(upload_dir, ignore_errors=True)
+            raise
 
-        if not documents:
-            logger.warning(f"No content extracted from file: {file.filename}")
-            raise ValueError("No content could be extracted from the file.")
-
-        index = VectorStoreIndex.from_documents(documents)
-        logger.info(f"File processed and indexed successfully: {file.filename}")
-        logger.info(f"Index now contains {len(index.docstore.docs)} documents")
-
-        return JSONResponse(content={
-            "message": f"{file_type} file processed and indexed successfully",
-            "filename": file.filename,
-            "content_preview": documents[0].text[:500] + "..." if len(documents[0].text) > 500 else documents[0].text
-        })
+        job = ingest_jobs.create(filename)
+        result = await ingest_document(job, get_session_id(request), upload_dir, file_path, filename, file_type)
+        return JSONResponse(content=result)
+    except UploadTooLarge as e:
+        return JSONResponse(content={"error": str(e)}, status_code=413)
     except Exception as e:
         logger.error(f"Error in upload_file: {str(e)}")
         logger.error(traceback.format_exc())
         return JSONResponse(content={"error": f"An unexpected error occurred: {str(e)}"}, status_code=500)
 
+@mate_router.post("/ingest")
+async def ingest_file(request: Request, filename: str):
+    # Job-style upload for large documents: the raw request body is streamed
+    # straight to disk, and parsing and indexing continue in the background
+    filename = os.path.basename(filename)
+    file_type = detect_file_type(filename)
+    upload_dir = new_upload_dir()
+    file_path = os.path.join(upload_dir, filename)
+    try:
+        with span("upload_save"):
+            size = await save_stream(request.stream(), file_path, max_upload_bytes())
+    except UploadTooLarge as e:
+        shutil.rmtree(upload_dir, ignore_errors=True)
+        return JSONResponse(content={"error": str(e)}, status_code=413)
+    except Exception:
+        shutil.rmtree(upload_dir, ignore_errors=True)
+        raise
+
+    job = ingest_jobs.create(filename)
+    logger.info(f"Received {filename} ({size} bytes) as job {job.job_id}")
+    task = asyncio.create_task(ingest_document(job, get_session_id(request), upload_dir, file_path, filename, file_type))
+    background_tasks.add(task)
+    task.add_done_callback(finish_background_task)
+    return JSONResponse(content={
+        "job_id": job.job_id,
+        "status_url": f"/mate/jobs/{job.job_id}",
+        "events_url": f"/mate/jobs/{job.job_id}/events",
+    }, status_code=202)
+
+async def ingest_bulk(job, session_id, upload_dir, files):
+    # files: (document name, path) pairs. All files are parsed in parallel
+    # in the process pool, then chunked, embedded and committed to the index
+    # as one batch, so the index is persisted once for the whole set.
+    try:
+        async def report_parsed(parsed, total):
+            await job.update("parsing", f"Parsed {parsed}/{total} files")
+
+        names = {path: name for name, path in files}
+        with span("parse"):
+            parsed, failures = await parse_files(parse_pool.get(), list(names), report_parsed)
+
+        documents = []
+        for path, file_documents in parsed.items():
+            for page_number, document in enumerate(file_documents):
+                document.id_ = f"{names[path]}#{page_number}"
+                documents.append(document)
+        if not documents:
+            raise ValueError("No content could be extracted from the uploaded files.")
+
+        await job.update("indexing", f"Embedding {len(documents)} pages from {len(parsed)} files")
+        document_index = index_manager.get(session_id)
+        await asyncio.to_thread(llama_index_settings.get)
+        with span("index_insert"):
+            added, skipped = await asyncio.to_thread(document_index.insert_documents, documents)
+        await asyncio.to_thread(index_manager.enforce_budget)
+        logger.info(f"Bulk ingest indexed {len(parsed)} files: {added} new chunks, {skipped} already indexed")
+
+        result = {
+            "message": f"{len(parsed)} files processed and indexed successfully",
+            "filenames": sorted(names[path] for path in parsed),
+            "failed": {names[path]: error for path, error in failures.items()},
+            "chunks_added": added,
+            "chunks_skipped": skipped,
+        }
+        await job.update("done", result=result)
+        return result
+    except Exception as e:
+        await job.update("failed", detail=str(e))
+        raise
+    finally:
+        await asyncio.to_thread(shutil.rmtree, upload_dir, True)
+
+@mate_router.post("/ingest/bulk")
+async def ingest_bulk_files(request: Request, files: list[UploadFile] = File(...)):
+    # Accepts any number of documents and zip/tar archives in one request
+    upload_dir = new_upload_dir()
+    budget = max_upload_bytes()
+    documents = []
+    try:
+        for index, upload in enumerate(files):
+            filename = os.path.basename(upload.filename)
+            # Each upload gets its own directory so equal names cannot collide
+            file_dir = os.path.join(upload_dir, str(index))
+            os.mkdir(file_dir)
+            file_path = os.path.join(file_dir, filename)
+            with span("upload_save"):
+                budget -= await save_stream(upload_chunks(upload), file_path, budget)
+            if is_archive(filename):
+                extract_dir = os.path.join(file_dir, "extracted")
+                # Extracted files count against the same budget as the uploads
+                members, extracted_bytes = await asyncio.to_thread(extract_archive, file_path, extract_dir, budget)
+                budget -= extracted_bytes
+                documents.extend((f"{filename}/{name}", path) for name, path in members)
+            else:
+                documents.append((filename, file_path))
+    except UploadTooLarge as e:
+        shutil.rmtree(upload_dir, ignore_errors=True)
+        return JSONResponse(content={"error": str(e)}, status_code=413)
+    except (ValueError, zipfile.BadZipFile, tarfile.TarError) as e:
+        shutil.rmtree(upload_dir, ignore_errors=True)
+        return JSONResponse(content={"error": f"Could not read archive: {str(e)}"}, status_code=400)
+    except Exception:
+        shutil.rmtree(upload_dir, ignore_errors=True)
+        raise
+
+    if not documents:
+        shutil.rmtree(upload_dir, ignore_errors=True)
+        return JSONResponse(content={"error": "No files to ingest"}, status_code=400)
+
+    job = ingest_jobs.create(f"{len(documents)} files")
+    logger.info(f"Received {len(documents)} files for bulk ingest as job {job.job_id}")
+    task = asyncio.create_task(ingest_bulk(job, get_session_id(request), upload_dir, documents))
+    background_tasks.add(task)
+    task.add_done_callback(finish_background_task)
+    return JSONResponse(content={
+        "job_id": job.job_id,
+        "files": len(documents),
+        "status_url": f"/mate/jobs/{job.job_id}",
+        "events_url": f"/mate/jobs/{job.job_id}/events",
+    }, status_code=202)
+
+def finish_background_task(task):
+    background_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"Ingest job failed: {task.exception()}")
+
+@mate_router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    # The job may be running in another worker; the shared state knows about it
+    state = await asyncio.to_thread(ingest_jobs.snapshot, job_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return JSONResponse(content=state)
+
+@mate_router.get("/jobs/{job_id}/events")
+async def stream_job(job_id: str):
+    job = ingest_jobs.get(job_id)
+    if job is not None:
+        changes = job.changes()
+    elif await asyncio.to_thread(ingest_jobs.snapshot, job_id) is not None:
+        changes = ingest_jobs.remote_changes(job_id)
+    else:
+        raise HTTPException(status_code=404, detail="Unknown job")
+
+    async def events():
+        async for state in changes:
+            yield f"event: progress\ndata: {json.dumps(state)}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+async def query_documents(session_id, document_index, message):
+    # Near-identical questions against an unchanged index reuse the previous answer
+    version = document_index.version
+    with span("embed_query"):
+        question_vector = (await embedding_service.get().aembed([message], QUERY_PRIORITY))[0]
+    cached_answer = answer_cache.lookup(session_id, version, question_vector)
+    if cached_answer is not None:
+        logger.info("Answered from the answer cache")
+        return cached_answer
+
+    # Retrieval and the LLM call both happen inside query_engine.query
+    with span("rag_query"):
+        query_engine = await asyncio.to_thread(document_index.query_engine)
+        response = await asyncio.to_thread(query_engine.query, message)
+    answer = str(response)
+    answer_cache.store(session_id, version, question_vector, answer)
+    return answer
+
 @mate_router.post("/chat")
-async def chat(chat_request: ChatRequest):
-    global index
+async def chat(request: Request, chat_request: ChatRequest):
     try:
-        if not chat_request.message and not chat_request.file:
+        session_id = get_session_id(request)
+        # Sessions without documents never load an index, so they never wait on an ingest
+        document_index, index = index_manager.get(session_id), None
+        if document_index.has_documents():
+            document_index, index = await load_session_index(session_id)
+
+        if not chat_request.message and not chat_request.file and not chat_request.fileHandle:
             raise HTTPException(status_code=400, detail="Message and file cannot both be empty")
 
-        if chat_request.file:
+        if chat_request.fileHandle:
+            media = await asyncio.to_thread(media_store.read, chat_request.fileHandle)
+            if media is None:
+                raise HTTPException(status_code=404, detail="Uploaded file has expired, please upload it again")
+            file_data, chat_request.fileType = media
+        elif chat_request.file:
+            # Older clients still send the file inline as base64
+            file_data = base64.b64decode(chat_request.file)
+
+        if chat_request.file or chat_request.fileHandle:
             if chat_request.fileType.startswith(('image/', 'audio/', 'video/')):
                 # Handle media files directly with Gemini
                 prompt = [chat_request.message or f"Analyze this {chat_request.fileType.split('/')[0]}", 
-                          {"mime_type": chat_request.fileType, "data": base64.b64decode(chat_request.file)}]
-                response = gemini_flash.generate_content(prompt)
+                          {"mime_type": chat_request.fileType, "data": file_data}]
+                with provider_call("gemini"):
+                    response = gemini_flash.get().generate_content(prompt)
                 mode = chat_request.fileType.split('/')[0].capitalize()
             else:
                 # For document types, use the RAG pipeline
                 if index:
-                    query_engine = index.as_query_engine()
-                    response = query_engine.query(chat_request.message)
+                    response = await query_documents(session_id, document_index, chat_request.message)
                     mode = "RAG"
                 else:
                     raise HTTPException(status_code=400, detail="No indexed documents available for query")
         elif chat_request.message:
             if index:
                 # If there are indexed documents, use RAG pipeline
-                query_engine = index.as_query_engine()
-                response = query_engine.query(chat_request.message)
+                response = await query_documents(session_id, document_index, chat_request.message)
                 mode = "RAG"
             else:
                 # If no documents are indexed, use direct Gemini processing
-                response = gemini_flash.generate_content(chat_request.message)
+                with provider_call("gemini"):
+                    response = gemini_flash.get().generate_content(chat_request.message)
                 mode = "Direct"
 
         # Extract the text content from the response
@@ -145,6 +468,56 @@ async def chat(chat_request: ChatRequest):
         logger.error(traceback.format_exc())
         return JSONResponse(content={"error": f"An unexpected error occurred: {str(e)}"}, status_code=500)
 
+@mate_router.get("/documents")
+async def list_documents(request: Request):
+    document_index, _ = await load_session_index(get_session_id(request))
+    documents = await asyncio.to_thread(document_index.documents)
+    files = {}
+    for ref_doc_id, chunks in documents.items():
+        filename = source_of(ref_doc_id)
+        files[filename] = files.get(filename, 0) + chunks
+    return JSONResponse(content={"documents": [{"filename": name, "chunks": chunks} for name, chunks in files.items()]})
+
+@mate_router.delete("/documents/{filename:path}")
+async def delete_document(request: Request, filename: str):
+    document_index, _ = await load_session_index(get_session_id(request))
+    documents = await asyncio.to_thread(document_index.documents)
+    ref_doc_ids = [ref_doc_id for ref_doc_id in documents if source_of(ref_doc_id) == filename]
+    if not ref_doc_ids:
+        raise HTTPException(status_code=404, detail=f"No indexed document named {filename}")
+    await asyncio.to_thread(document_index.delete_documents, ref_doc_ids)
+    logger.info(f"Removed {filename} from the index")
+    return JSONResponse(content={"message": f"{filename} removed from the index"})
+
+@mate_router.get("/index_stats")
+async def index_stats():
+    return JSONResponse(content=index_manager.stats())
+
+@mate_router.get("/embedding_stats")
+async def embedding_stats():
+    if not embedding_service.built:
+        return JSONResponse(content={"loaded": False})
+    return JSONResponse(content=embedding_service.get().stats())
+
+@mate_router.get("/answer_cache/stats")
+async def answer_cache_stats():
+    return JSONResponse(content=answer_cache.stats())
+
+@mate_router.on_event("startup")
+async def sweep_media_store():
+    removed = await asyncio.to_thread(media_store.sweep_disk)
+    logger.info(f"Removed {removed} expired media files")
+
+@mate_router.on_event("shutdown")
+async def close_parse_pool():
+    if parse_pool.built:
+        parse_pool.get().shutdown(cancel_futures=True)
+
+async def warm_up():
+    # Explicit warm-up hook: load the models now instead of on the first request
+    await asyncio.to_thread(gemini_flash.get)
+    await asyncio.to_thread(llama_index_settings.get)
+
 def set_templates(templates):
     global mate_templates
     mate_templates = templates
@@ -0,0 +1,122 @@
+# multimodal_mate/media_store.py
+import json
+import os
+import secrets
+import threading
+import time
+from pathlib import Path
+
+from common.shared_state import resolve_state
+from multimodal_mate.ingest import UploadTooLarge
+
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+class MediaStore:
+    """Uploaded media kept on disk and referenced by an opaque handle until its TTL expires.
+
+    With a SharedState, handles are also recorded there, so a chat request
+    can use media uploaded through another worker.
+    """
+
+    def __init__(self, directory, ttl_seconds=3600, state=None):
+        self.directory = Path(directory)
+        self.ttl_seconds = ttl_seconds
+        self._state = state  # SharedState, None, or the lazy shared_state
+        self._entries = {}  # handle -> (path, mime_type, filename, expires_at)
+        self._lock = threading.Lock()
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    @property
+    def state(self):
+        return resolve_state(self._state)
+
+    def put_file(self, source, mime_type, filename, max_bytes=None):
+        # Copies a file-like object to disk in chunks; blocking, call from a worker thread.
+        # Stops and removes the partial file as soon as max_bytes is crossed.
+        handle = secrets.token_urlsafe(16)
+        path = self.directory / handle
+        written = 0
+        try:
+            with open(path, "wb") as target:
+                while chunk := source.read(COPY_CHUNK_SIZE):
+                    written += len(chunk)
+                    if max_bytes is not None and written > max_bytes:
+                        raise UploadTooLarge(f"File exceeds the {max_bytes // (1024 * 1024)} MB upload limit")
+                    target.write(chunk)
+        except BaseException:
+            path.unlink(missing_ok=True)
+            raise
+        with self._lock:
+            self._entries[handle] = (path, mime_type, filename, time.time() + self.ttl_seconds)
+        if self.state is not None:
+            self.state.put("media", handle, json.dumps([str(path), mime_type, filename]), self.ttl_seconds)
+        return handle
+
+    def _shared_entry(self, handle):
+        if self.state is None:
+            return None
+        value = self.state.get("media", handle)
+        if value is None:
+            return None
+        path, mime_type, filename = json.loads(value)
+        return Path(path), mime_type, filename
+
+    def get(self, handle):
+        # Returns (path, mime_type, filename) or None if the handle is unknown or expired
+        self.evict_expired()
+        with self._lock:
+            entry = self._entries.get(handle)
+        if entry is None:
+            # Uploaded through another worker
+            return self._shared_entry(handle)
+        path, mime_type, filename, _ = entry
+        return path, mime_type, filename
+
+    def read(self, handle):
+        entry = self.get(handle)
+        if entry is None:
+            return None
+        path, mime_type, _ = entry
+        return path.read_bytes(), mime_type
+
+    def delete(self, handle):
+        with self._lock:
+            entry = self._entries.pop(handle, None)
+        if entry is None:
+            entry = self._shared_entry(handle)
+        if self.state is not None:
+            self.state.delete("media", handle)
+        if entry is not None:
+            entry[0].unlink(missing_ok=True)
+
+    def evict_expired(self):
+        now = time.time()
+        with self._lock:
+            expired = [handle for handle, entry in self._entries.items() if entry[3] <= now]
+            paths = [self._entries.pop(handle)[0] for handle in expired]
+        for path in paths:
+            path.unlink(missing_ok=True)
+        return len(paths)
+
+    def sweep_disk(self):
+        # Removes files older than the TTL, including ones left by a previous process
+        cutoff = time.time() - self.ttl_seconds
+        removed = 0
+        for path in self.directory.iterdir():
+            if path.is_file() and path.stat().st_mtime <= cutoff:
+                path.unlink(missing_ok=True)
+                removed += 1
+        if self.state is not None:
+            self.state.purge_expired()
+        return removed
+
+    def stats(self):
+        with self._lock:
+            stats = {
+                "entries": len(self._entries),
+                "bytes": sum(os.path.getsize(entry[0]) for entry in self._entries.values() if entry[0].exists()),
+            }
+        if self.state is not None:
+            stats["shared_entries"] = self.state.count("media")
+        return stats
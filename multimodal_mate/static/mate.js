@@ -4,29 +4,131 @@ document.addEventListener('DOMContentLoaded', () => {
     const userInput = document.getElementById('userInput');
     const sendButton = document.getElementById('sendButton');
     const chatHistory = document.getElementById('chatHistory');
+    // Server-side handles for media already uploaded, so chat requests never resend the bytes
+    const mediaHandles = new WeakMap();
+    // Each browser gets its own document index on the server
+    const sessionId = getSessionId();
 
     fileUpload.addEventListener('change', async (event) => {
         const files = event.target.files;
         showUploadStatus('Uploading...');
 
+        // Several documents, or any archive, go to the server as one bulk ingest
+        const documents = Array.from(files).filter(file => !isMediaFile(file));
+        const bulk = documents.length > 1 || documents.some(isArchive);
         for (let file of files) {
-            await handleFileUpload(file);
+            if (!bulk || isMediaFile(file)) {
+                await handleFileUpload(file);
+            }
+        }
+        if (bulk) {
+            await handleBulkUpload(documents);
         }
     });
 
-    async function handleFileUpload(file) {
+    function isMediaFile(file) {
+        return /^(image|audio|video)\//.test(file.type);
+    }
+
+    // Documents go through the job API: the upload returns right away and
+    // parsing and indexing progress is polled until the job finishes
+    async function ingestDocument(file) {
+        const response = await fetch(`/mate/ingest?filename=${encodeURIComponent(file.name)}`, {
+            method: 'POST',
+            headers: {
+                'X-Session-Id': sessionId
+            },
+            body: file
+        });
+        const submitted = await response.json();
+        if (!response.ok) {
+            return { response, result: submitted };
+        }
+        return waitForJob(submitted);
+    }
+
+    async function waitForJob(submitted) {
+        while (true) {
+            await new Promise(resolve => setTimeout(resolve, 1000));
+            const statusResponse = await fetch(submitted.status_url);
+            const job = await statusResponse.json();
+            if (!statusResponse.ok) {
+                return { response: statusResponse, result: { error: job.detail } };
+            }
+            if (job.status === 'done') {
+                return { response: statusResponse, result: job.result };
+            }
+            if (job.status === 'failed') {
+                return { response: { ok: false }, result: { error: job.detail } };
+            }
+            showUploadStatus(job.detail || 'Processing...');
+        }
+    }
+
+    function isArchive(file) {
+        return /\.(zip|tar|tar\.gz|tgz|tar\.bz2|tar\.xz)$/i.test(file.name);
+    }
+
+    async function handleBulkUpload(files) {
         const formData = new FormData();
-        formData.append('file', file);
+        for (let file of files) {
+            formData.append('files', file);
+        }
 
         try {
-            const response = await fetch('/mate/upload', {
+            const response = await fetch('/mate/ingest/bulk', {
                 method: 'POST',
+                headers: {
+                    'X-Session-Id': sessionId
+                },
                 body: formData
             });
-            const result = await response.json();
+            const submitted = await response.json();
+            const { response: jobResponse, result } = response.ok
+                ? await waitForJob(submitted)
+                : { response, result: submitted };
+            if (jobResponse.ok) {
+                showUploadStatus(result.message);
+                appendMessage('system', `Files uploaded and processed: ${result.filenames.join(', ')}`);
+                for (let [name, error] of Object.entries(result.failed)) {
+                    appendMessage('system', `Upload failed: ${name} - ${error}`);
+                }
+            } else {
+                console.error('Bulk upload failed:', result.error);
+                showUploadStatus(`Upload failed: ${result.error}`);
+                appendMessage('system', `Upload failed: ${result.error}`);
+            }
+        } catch (error) {
+            console.error('Error:', error);
+            showUploadStatus('Upload failed due to network error');
+            appendMessage('system', 'Upload failed - Network error');
+        }
+    }
+
+    async function uploadMedia(file) {
+        const formData = new FormData();
+        formData.append('file', file);
+
+        const response = await fetch('/mate/upload', {
+            method: 'POST',
+            headers: {
+                'X-Session-Id': sessionId
+            },
+            body: formData
+        });
+        return { response, result: await response.json() };
+    }
+
+    async function handleFileUpload(file) {
+        try {
+            const { response, result } = isMediaFile(file) ? await uploadMedia(file) : await ingestDocument(file);
             if (response.ok) {
+                if (result.handle) {
+                    mediaHandles.set(file, result.handle);
+                }
                 showUploadStatus(result.message);
                 appendMessage('system', `File uploaded and processed: ${file.name}`);
+                return result;
             } else {
                 console.error('Upload failed:', result.error);
                 showUploadStatus(`Upload failed: ${result.error}`);
@@ -58,32 +160,40 @@ document.addEventListener('DOMContentLoaded', () => {
     async function sendMessage() {
         const message = userInput.value.trim();
         const fileInput = document.getElementById('fileUpload');
-        let fileData = null;
+        let fileHandle = null;
         let fileType = null;
+        let previewUrl = null;
 
         if (fileInput.files.length > 0) {
             const file = fileInput.files[0];
             fileType = file.type;
             
             if (fileType.startsWith('image/') || fileType.startsWith('audio/') || fileType.startsWith('video/')) {
-                fileData = await fileToBase64(file);
+                if (!mediaHandles.has(file)) {
+                    await handleFileUpload(file);
+                }
+                fileHandle = mediaHandles.get(file) || null;
+                if (fileType.startsWith('image/')) {
+                    previewUrl = URL.createObjectURL(file);
+                }
             } else {
                 await handleFileUpload(file);
                 fileInput.value = '';
             }
         }
 
-        if (message || fileData) {
-            appendMessage('user', message, fileData);
+        if (message || fileHandle) {
+            appendMessage('user', message, previewUrl);
             userInput.value = '';
 
             try {
                 const response = await fetch('/mate/chat', {
                     method: 'POST',
                     headers: {
-                        'Content-Type': 'application/json'
+                        'Content-Type': 'application/json',
+                        'X-Session-Id': sessionId
                     },
-                    body: JSON.stringify({ message, file: fileData, fileType })
+                    body: JSON.stringify({ message, fileHandle, fileType })
                 });
                 const result = await response.json();
                 if (response.ok) {
@@ -101,7 +211,7 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
 
-    function appendMessage(sender, content, imageData = null, mode = null) {
+    function appendMessage(sender, content, imageUrl = null, mode = null) {
         const messageElement = document.createElement('div');
         messageElement.className = `mb-4 ${sender === 'user' ? 'text-right' : 'text-left'}`;
         let bgColor = sender === 'user' ? 'bg-blue-600' : 'bg-gray-700';
@@ -129,20 +239,20 @@ document.addEventListener('DOMContentLoaded', () => {
             hljs.highlightBlock(block);
         });
 
-        if (imageData) {
+        if (imageUrl) {
             const imageElement = document.createElement('img');
-            imageElement.src = `data:image/jpeg;base64,${imageData}`;
+            imageElement.src = imageUrl;
             imageElement.className = 'mt-2 rounded-lg max-w-full';
             messageElement.querySelector('.inline-block').appendChild(imageElement);
         }
     }
 
-    function fileToBase64(file) {
-        return new Promise((resolve, reject) => {
-            const reader = new FileReader();
-            reader.readAsDataURL(file);
-            reader.onload = () => resolve(reader.result.split(',')[1]);
-            reader.onerror = error => reject(error);
-        });
+    function getSessionId() {
+        let id = localStorage.getItem('mateSessionId');
+        if (!id) {
+            id = crypto.randomUUID();
+            localStorage.setItem('mateSessionId', id);
+        }
+        return id;
     }
 });
\ No newline at end of file
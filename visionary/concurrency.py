@@ -0,0 +1,33 @@
+# visionary/concurrency.py
+import asyncio
+import os
+
+# Default number of in-flight calls allowed per upstream provider.
+# Override with VISIONARY_<PROVIDER>_CONCURRENCY, e.g. VISIONARY_TTS_CONCURRENCY=32
+DEFAULT_PROVIDER_LIMITS = {
+    "gemini": 8,
+    "tts": 16,
+    "perplexity": 4,
+}
+
+_semaphores = {}
+
+
+def provider_concurrency(provider):
+    env_value = os.getenv(f"VISIONARY_{provider.upper()}_CONCURRENCY")
+    if env_value:
+        return max(1, int(env_value))
+    return DEFAULT_PROVIDER_LIMITS.get(provider, 8)
+
+
+def provider_limit(provider):
+    # One semaphore per provider, shared by every request in this process
+    semaphore = _semaphores.get(provider)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(provider_concurrency(provider))
+        _semaphores[provider] = semaphore
+    return semaphore
+
+
+def reset_provider_limits():
+    _semaphores.clear()
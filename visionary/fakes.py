@@ -0,0 +1,95 @@
+# visionary/fakes.py
+#
+# Local stand-ins for Gemini, Google TTS and Perplexity, used when
+# APP_PROVIDERS=fake. They mirror the parts of each client API that
+# visionary.py calls, with latency and failures from common.fakes.FakeBehavior.
+import asyncio
+import json
+import os
+import random
+import time
+from types import SimpleNamespace
+
+import httpx
+
+from common.fakes import FakeBehavior
+
+# One silent MPEG-1 Layer III frame: 128 kbps, 44.1 kHz, mono, 1152 samples
+SILENT_MP3_FRAME = bytes([0xFF, 0xFB, 0x90, 0xC0]) + bytes(413)
+MP3_FRAMES_PER_SECOND = 44100 / 1152
+
+FAKE_ANSWER = "There is a wooden table in front of you with a laptop and a cup of coffee on it. The path to your left is clear."
+
+
+def silent_mp3(seconds):
+    return SILENT_MP3_FRAME * max(1, int(seconds * MP3_FRAMES_PER_SECOND))
+
+
+class FakeGeminiModel:
+    """Answers like the visionary prompts would: an answer, a navigation
+    request or a search request, picked at FAKE_GEMINI_NAVIGATION_RATE and
+    FAKE_GEMINI_SEARCH_RATE."""
+
+    def __init__(self, navigation_rate=0.05, search_rate=0.1):
+        self.behavior = FakeBehavior("gemini", latency_ms=800, jitter_ms=200)
+        self.navigation_rate = float(os.getenv("FAKE_GEMINI_NAVIGATION_RATE", navigation_rate))
+        self.search_rate = float(os.getenv("FAKE_GEMINI_SEARCH_RATE", search_rate))
+
+    def _answer(self):
+        roll = random.random()
+        if roll < self.navigation_rate:
+            return "Opening Google Maps for the nearest pharmacy"
+        if roll < self.navigation_rate + self.search_rate:
+            return f"Searching what is the weather today in city {random.randrange(50)}"
+        return FAKE_ANSWER
+
+    async def generate_content_async(self, parts, stream=False):
+        answer = self._answer()
+        if not stream:
+            await self.behavior.call()
+            return SimpleNamespace(text=f"{answer} English")
+        # Streaming prompt: language word first, then the answer in chunks
+        await self.behavior.call(scale=0.4)
+        return self._stream(f"English\n{answer}")
+
+    async def _stream(self, text):
+        chunks = [text[start:start + 40] for start in range(0, len(text), 40)]
+        for chunk in chunks:
+            start = time.perf_counter()
+            await asyncio.sleep(self.behavior.delay_seconds(scale=0.6 / len(chunks)))
+            self.behavior.record(time.perf_counter() - start)
+            yield SimpleNamespace(text=chunk)
+
+
+class FakeTTSClient:
+    """Returns silent MP3 audio roughly as long as the text would take to speak."""
+
+    def __init__(self):
+        self.behavior = FakeBehavior("tts", latency_ms=150, jitter_ms=50)
+
+    async def synthesize_speech(self, input, voice, audio_config):
+        await self.behavior.call()
+        return SimpleNamespace(audio_content=silent_mp3(min(len(input.text) / 15, 30)))
+
+    async def list_voices(self):
+        await self.behavior.call()
+        from visionary.visionary import language_voices
+        names = [name for _, voice_names in language_voices.values() for name in voice_names]
+        return SimpleNamespace(voices=[SimpleNamespace(name=name) for name in names])
+
+
+class FakePerplexityTransport(httpx.AsyncBaseTransport):
+    """httpx transport answering Perplexity chat completions locally, so the
+    real request path (rate limiter, pool, error handling) is still exercised."""
+
+    def __init__(self):
+        self.behavior = FakeBehavior("perplexity", latency_ms=1200, jitter_ms=300)
+
+    async def handle_async_request(self, request):
+        try:
+            await self.behavior.call()
+        except Exception:
+            return httpx.Response(503, json={"error": "injected failure"}, request=request)
+        query = json.loads(request.content)["messages"][-1]["content"]
+        answer = f"Here is a short answer to: {query}"
+        return httpx.Response(200, json={"choices": [{"message": {"content": answer}}]}, request=request)
@@ -0,0 +1,119 @@
+# visionary/frames.py
+import hashlib
+import io
+import threading
+import time
+from collections import OrderedDict
+
+from PIL import Image, ImageOps
+
+from visionary.search_cache import normalize_query
+
+
+def dhash(image, hash_size=8):
+    # Difference hash: compares neighbouring pixels of a tiny grayscale copy,
+    # so small changes in exposure, noise or framing flip only a few bits
+    small = image.convert("L").resize((hash_size + 1, hash_size), Image.BILINEAR)
+    pixels = list(small.getdata())
+    value = 0
+    for row in range(hash_size):
+        for column in range(hash_size):
+            left = pixels[row * (hash_size + 1) + column]
+            right = pixels[row * (hash_size + 1) + column + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count("1")
+
+
+def prepare_frame(data, max_side, quality):
+    # Blocking. Returns (jpeg bytes, perceptual hash). The frame is rotated
+    # upright, scaled down so its longer side is at most max_side and
+    # re-encoded as JPEG; the original is kept if that would not be smaller.
+    with Image.open(io.BytesIO(data)) as opened:
+        image = ImageOps.exif_transpose(opened).convert("RGB")
+    frame_hash = dhash(image)
+    image.thumbnail((max_side, max_side), Image.LANCZOS)
+    output = io.BytesIO()
+    image.save(output, format="JPEG", quality=quality, optimize=True)
+    prepared = output.getvalue()
+    return (prepared if len(prepared) < len(data) else data), frame_hash
+
+
+def question_key(question=None, audio=None):
+    # Equivalent questions share a key: transcribed text is compared after
+    # normalising case, punctuation and spacing; recorded audio only matches
+    # the exact same clip
+    if question:
+        return "text:" + normalize_query(question)
+    return "audio:" + hashlib.sha256(audio or b"").hexdigest()
+
+
+class SceneCache:
+    """Recent scene analyses, reused for the same question about a near-identical frame.
+
+    Frames match when their perceptual hashes differ in at most max_distance
+    bits. Entries live for a short window, since the scene in front of the
+    camera keeps changing.
+    """
+
+    def __init__(self, max_distance=6, ttl_seconds=30, max_entries=256):
+        self.max_distance = max_distance
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # (question key, frame hash) -> (answer, expires_at)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.frames = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def record_frame(self, original_size, prepared_size):
+        with self._lock:
+            self.frames += 1
+            self.bytes_in += original_size
+            self.bytes_out += prepared_size
+
+    def lookup(self, question, frame_hash):
+        now = time.time()
+        with self._lock:
+            best_key, best_distance = None, self.max_distance + 1
+            for key, (_, expires_at) in list(self._entries.items()):
+                if expires_at <= now:
+                    del self._entries[key]
+                    continue
+                if key[0] != question:
+                    continue
+                distance = hamming_distance(key[1], frame_hash)
+                if distance < best_distance:
+                    best_key, best_distance = key, distance
+            if best_key is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best_key)
+            self.hits += 1
+            return self._entries[best_key][0]
+
+    def store(self, question, frame_hash, answer):
+        with self._lock:
+            self._entries[(question, frame_hash)] = (answer, time.time() + self.ttl_seconds)
+            self._entries.move_to_end((question, frame_hash))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "frames": self.frames,
+                "bytes_in": self.bytes_in,
+                "bytes_out": self.bytes_out,
+                "bytes_saved": self.bytes_in - self.bytes_out,
+            }
@@ -0,0 +1,72 @@
+# visionary/mp3.py
+#
+# Joins MP3 clips at the frame level. MP3 streams are a sequence of
+# self-contained frames, so clips with the same encoding can be played back
+# to back by concatenating their frames; no decoding or re-encoding needed.
+
+MPEG1_LAYER3_BITRATES = [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320]
+MPEG2_LAYER3_BITRATES = [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160]
+SAMPLE_RATES = {
+    3: [44100, 48000, 32000],  # MPEG-1
+    2: [22050, 24000, 16000],  # MPEG-2
+    0: [11025, 12000, 8000],   # MPEG-2.5
+}
+
+
+def _skip_id3v2(data):
+    if len(data) < 10 or data[:3] != b"ID3":
+        return 0
+    size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def _strip_id3v1(data):
+    if len(data) >= 128 and data[-128:-125] == b"TAG":
+        return data[:-128]
+    return data
+
+
+def _frame_length(data, offset):
+    # Returns the length of the Layer III frame starting at offset, or None
+    if offset + 4 > len(data) or data[offset] != 0xFF or (data[offset + 1] & 0xE0) != 0xE0:
+        return None
+    version = (data[offset + 1] >> 3) & 0x03
+    layer = (data[offset + 1] >> 1) & 0x03
+    bitrate_index = data[offset + 2] >> 4
+    sample_rate_index = (data[offset + 2] >> 2) & 0x03
+    padding = (data[offset + 2] >> 1) & 0x01
+    if version == 1 or layer != 1 or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+    sample_rate = SAMPLE_RATES[version][sample_rate_index]
+    if version == 3:
+        return 144 * MPEG1_LAYER3_BITRATES[bitrate_index] * 1000 // sample_rate + padding
+    return 72 * MPEG2_LAYER3_BITRATES[bitrate_index] * 1000 // sample_rate + padding
+
+
+def _is_info_frame(data, offset):
+    # LAME/Xing "Info" frames carry whole-file frame counts, which would be
+    # wrong once clips are joined, so they are dropped
+    version = (data[offset + 1] >> 3) & 0x03
+    has_crc = not (data[offset + 1] & 0x01)
+    mono = (data[offset + 3] >> 6) == 3
+    if version == 3:
+        side_info = 17 if mono else 32
+    else:
+        side_info = 9 if mono else 17
+    tag_offset = offset + 4 + (2 if has_crc else 0) + side_info
+    return data[tag_offset:tag_offset + 4] in (b"Xing", b"Info")
+
+
+def audio_frames(data):
+    # The frame data of one clip, without ID3 tags or an Info header frame
+    start = _skip_id3v2(data)
+    data = _strip_id3v1(data)
+    length = _frame_length(data, start)
+    if length is not None and _is_info_frame(data, start):
+        start += length
+    return data[start:]
+
+
+def concat_mp3(*clips):
+    return b"".join(audio_frames(clip) for clip in clips if clip)
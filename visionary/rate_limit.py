@@ -0,0 +1,149 @@
+# visionary/rate_limit.py
+import asyncio
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+
+class RateLimitExceeded(Exception):
+    pass
+
+
+class LocalBucketState:
+    """Token bucket state for this process only."""
+
+    def __init__(self, rate_per_second, capacity):
+        self.rate_per_second = rate_per_second
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self):
+        # Takes a token and returns 0, or returns the seconds until one is available
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate_per_second)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate_per_second
+
+
+class SQLiteBucketState:
+    """Token bucket state in a SQLite file, shared by every worker process that opens it.
+
+    Each take is one short IMMEDIATE transaction, so concurrent workers see
+    a single consistent bucket. Uses wall-clock time, which all workers share.
+    The file is opened on the first take, so creating a limiter at import
+    does no I/O.
+    """
+
+    blocking = True
+
+    def __init__(self, path, name, rate_per_second, capacity):
+        self.path = path
+        self.name = name
+        self.rate_per_second = rate_per_second
+        self.capacity = capacity
+        self._local = threading.local()
+
+    def _connect(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS token_buckets (name TEXT PRIMARY KEY, tokens REAL, updated REAL)"
+            )
+            self._local.connection = connection
+        return connection
+
+    def take(self):
+        connection = self._connect()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            row = connection.execute("SELECT tokens, updated FROM token_buckets WHERE name = ?", (self.name,)).fetchone()
+            tokens = self.capacity if row is None else min(self.capacity, row[0] + (now - row[1]) * self.rate_per_second)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / self.rate_per_second
+            connection.execute(
+                "INSERT OR REPLACE INTO token_buckets (name, tokens, updated) VALUES (?, ?, ?)",
+                (self.name, tokens, now),
+            )
+            connection.execute("COMMIT")
+            return wait
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+
+class TokenBucketLimiter:
+    """Async token bucket with a bounded, first-come-first-served wait queue.
+
+    At most max_waiters callers wait for a token at once; further callers are
+    rejected immediately with RateLimitExceeded instead of piling up.
+    """
+
+    def __init__(self, state, max_waiters):
+        self.state = state
+        self.max_waiters = max_waiters
+        self._turn = asyncio.Lock()
+        self._waiters = 0
+        self.acquired = 0
+        self.rejected = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    async def _take(self):
+        if getattr(self.state, "blocking", False):
+            return await asyncio.to_thread(self.state.take)
+        return self.state.take()
+
+    async def acquire(self):
+        if self._waiters >= self.max_waiters:
+            self.rejected += 1
+            raise RateLimitExceeded(f"More than {self.max_waiters} requests are waiting for the rate limit")
+        self._waiters += 1
+        start = time.monotonic()
+        try:
+            # Only the head of the queue polls the bucket, so tokens go out in arrival order
+            async with self._turn:
+                while (wait := await self._take()) > 0:
+                    await asyncio.sleep(wait)
+        finally:
+            self._waiters -= 1
+        waited = time.monotonic() - start
+        self.acquired += 1
+        self.total_wait_seconds += waited
+        self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+    def stats(self):
+        return {
+            "rate_per_second": self.state.rate_per_second,
+            "capacity": self.state.capacity,
+            "shared": isinstance(self.state, SQLiteBucketState),
+            "waiting": self._waiters,
+            "acquired": self.acquired,
+            "rejected": self.rejected,
+            "avg_wait_ms": self.total_wait_seconds / self.acquired * 1000 if self.acquired else 0.0,
+            "max_wait_ms": self.max_wait_seconds * 1000,
+        }
+
+
+def create_limiter(name, rate_per_minute, burst, max_waiters, db_path=None):
+    # Shared across worker processes when db_path is set, per process otherwise
+    rate_per_second = rate_per_minute / 60
+    if db_path:
+        state = SQLiteBucketState(db_path, name, rate_per_second, burst)
+    else:
+        state = LocalBucketState(rate_per_second, burst)
+    return TokenBucketLimiter(state, max_waiters)
@@ -0,0 +1,130 @@
+# visionary/search_cache.py
+import asyncio
+import json
+import time
+import unicodedata
+from collections import OrderedDict
+
+from common.shared_state import resolve_state
+
+
+def normalize_query(query):
+    # Case, Unicode form, punctuation and spacing do not change what is
+    # being asked, so "Weather today?" and "weather  today" share an entry
+    query = unicodedata.normalize("NFKC", query).casefold()
+    # By Unicode category rather than \w, which would drop combining vowel
+    # signs in scripts such as Devanagari
+    query = "".join(" " if unicodedata.category(char)[0] in "PS" else char for char in query)
+    return " ".join(query.split())
+
+
+class SearchCache:
+    """Search results by normalized query, with per-entry expiry and single-flight fetches.
+
+    Concurrent lookups of a query that is not cached share one upstream call.
+    Only results the caller marks as cacheable are stored, so a failure is
+    retried on the next request instead of being served for the whole TTL.
+
+    With a SharedState, a miss checks the entries stored by other worker
+    processes before calling upstream, and fetched results are stored there.
+    """
+
+    def __init__(self, ttl_seconds=300, max_entries=2000, state=None):
+        self.ttl_seconds = ttl_seconds
+        self._state = state  # SharedState, None, or the lazy shared_state
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # normalized query -> (result, expires_at)
+        self._inflight = {}
+        self.hits = 0
+        self.coalesced = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def state(self):
+        return resolve_state(self._state)
+
+    def _get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        result, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return result
+
+    def _put(self, key, result, ttl_seconds):
+        self._entries[key] = (result, time.monotonic() + ttl_seconds)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get_or_fetch(self, query, fetch, cacheable=lambda result: True, ttl_seconds=None):
+        key = normalize_query(query)
+        result = self._get(key)
+        if result is not None:
+            self.hits += 1
+            return result
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+            # shield: one waiter going away must not cancel the shared call
+            return await asyncio.shield(inflight)
+
+        async def fetch_and_store():
+            try:
+                shared = await self._get_shared(key)
+                if shared is not None:
+                    self.shared_hits += 1
+                    result, remaining_seconds = shared
+                    self._put(key, result, remaining_seconds)
+                    return result
+                self.misses += 1
+                result = await fetch(query)
+                if cacheable(result):
+                    entry_ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+                    self._put(key, result, entry_ttl)
+                    await self._put_shared(key, result, entry_ttl)
+                return result
+            finally:
+                self._inflight.pop(key, None)
+
+        # The fetch runs as its own task, so it completes and is cached even
+        # if the request that started it goes away
+        task = asyncio.create_task(fetch_and_store())
+        self._inflight[key] = task
+        return await asyncio.shield(task)
+
+    async def _get_shared(self, key):
+        # (result, seconds left) from another worker's fetch, or None
+        if self.state is None:
+            return None
+        value = await asyncio.to_thread(self.state.get, "search", key)
+        if value is None:
+            return None
+        result, expires_at = json.loads(value)
+        remaining_seconds = expires_at - time.time()
+        return (result, remaining_seconds) if remaining_seconds > 0 else None
+
+    async def _put_shared(self, key, result, ttl_seconds):
+        if self.state is not None:
+            value = json.dumps([result, time.time() + ttl_seconds])
+            await asyncio.to_thread(self.state.put, "search", key, value, ttl_seconds)
+
+    def stats(self):
+        lookups = self.hits + self.coalesced + self.shared_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "inflight": len(self._inflight),
+            "hits": self.hits,
+            "coalesced": self.coalesced,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.coalesced + self.shared_hits) / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+        }
@@ -12,7 +12,15 @@ let lastX = 0, lastY = 0, lastZ = 0;
 let lastTapTime = 0;
 let tapCount = 0;
 let audioPlayer = null;
+let audioQueue = [];
 let videoStream = null;
+// Browser speech recognition, run alongside the recorder when available. The
+// transcript is sent as the "question" field so the server can reuse answers
+// to the same question about the same scene; recorded audio never repeats.
+const SpeechRecognition = window.SpeechRecognition || window.webkitSpeechRecognition;
+const TRANSCRIPT_WAIT_MS = 800;
+let recognition = null;
+let transcriptPromise = null;
 
 async function startApp() {
     try {
@@ -210,6 +218,7 @@ async function startRecording() {
         mediaRecorder.onstop = sendAudioAndImageToBackend;
 
         mediaRecorder.start();
+        startTranscription();
         isRecording = true;
         micBtnWrapper.classList.add('recording');
         micBtn.querySelector('i').classList.add('text-red-500');
@@ -219,9 +228,57 @@ async function startRecording() {
     }
 }
 
+function startTranscription() {
+    transcriptPromise = null;
+    if (!SpeechRecognition) {
+        return;
+    }
+    try {
+        recognition = new SpeechRecognition();
+        recognition.lang = navigator.language || 'en-US';
+        recognition.continuous = true;
+        recognition.interimResults = false;
+        const parts = [];
+        transcriptPromise = new Promise(resolve => {
+            recognition.onresult = (event) => {
+                for (let i = event.resultIndex; i < event.results.length; i++) {
+                    if (event.results[i].isFinal) {
+                        parts.push(event.results[i][0].transcript);
+                    }
+                }
+            };
+            recognition.onerror = () => resolve('');
+            recognition.onend = () => resolve(parts.join(' ').trim());
+        });
+        recognition.start();
+    } catch (error) {
+        console.warn('Speech recognition unavailable:', error);
+        recognition = null;
+        transcriptPromise = null;
+    }
+}
+
+function stopTranscription() {
+    if (recognition) {
+        recognition.stop();
+        recognition = null;
+    }
+}
+
+async function takeTranscript() {
+    // The last result can arrive just after recording stops; never wait long for it
+    if (!transcriptPromise) {
+        return '';
+    }
+    const timeout = new Promise(resolve => setTimeout(() => resolve(''), TRANSCRIPT_WAIT_MS));
+    const transcript = await Promise.race([transcriptPromise, timeout]);
+    transcriptPromise = null;
+    return transcript;
+}
+
 async function sendAudioAndImageToBackend() {
     const audioBlob = new Blob(audioChunks, { type: 'audio/webm' });
-    const imageBlob = await captureImage();
+    const [imageBlob, transcript] = await Promise.all([captureImage(), takeTranscript()]);
 
     if (!imageBlob) {
         console.error('Failed to capture image');
@@ -232,9 +289,12 @@ async function sendAudioAndImageToBackend() {
     const formData = new FormData();
     formData.append('audio', audioBlob, 'recording.webm');
     formData.append('image', imageBlob, 'capture.jpg');
+    if (transcript) {
+        formData.append('question', transcript);
+    }
 
     try {
-        const response = await fetch('/visionary/process_audio_and_image', { // Adjusted URL
+        const response = await fetch('/visionary/process_audio_and_image/stream', {
             method: 'POST',
             body: formData
         });
@@ -243,26 +303,65 @@ async function sendAudioAndImageToBackend() {
             throw new Error(`HTTP error! status: ${response.status}`);
         }
 
-        const result = await response.json();
+        resetAudioQueue();
+        let receivedAudio = false;
+        await readServerEvents(response, (event, data) => {
+            if (event === 'audio') {
+                // Sentences arrive in order while the rest of the answer is still being generated
+                receivedAudio = true;
+                enqueueAudioResponse(data.audio);
+            } else if (event === 'navigation') {
+                handleNavigation(data.location);
+            } else if (event === 'error') {
+                console.error('Server error:', data.error);
+                receivedAudio = true;
+                enqueueAudioResponse(data.audio);
+            }
+        });
 
-        if (!result.audio) {
+        if (!receivedAudio) {
             throw new Error("Response does not contain audio data");
         }
-
-        if (result.is_navigation) {
-            playAudioResponse(result.audio);
-            handleNavigation(result.location);
-        } else if (result.is_searching) {
-            playAudioResponse(result.audio);
-        } else {
-            playAudioResponse(result.audio);
-        }
     } catch (error) {
         console.error('Error processing request:', error);
         playAudioResponse(synthesize_speech("I'm sorry, but there was an error processing your request. Please try again."));
     }
 }
 
+async function readServerEvents(response, onEvent) {
+    // Minimal text/event-stream parser for a POST response body
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) {
+            break;
+        }
+        buffer += decoder.decode(value, { stream: true });
+
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const rawEvent = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+
+            let event = 'message';
+            let data = '';
+            for (const line of rawEvent.split('\n')) {
+                if (line.startsWith('event: ')) {
+                    event = line.slice(7);
+                } else if (line.startsWith('data: ')) {
+                    data += line.slice(6);
+                }
+            }
+            if (data) {
+                onEvent(event, JSON.parse(data));
+            }
+        }
+    }
+}
+
 async function captureImage() {
     if (!video.srcObject) {
         console.error('Video stream is not available');
@@ -278,6 +377,7 @@ async function captureImage() {
 
 function stopRecording() {
     if (mediaRecorder && isRecording) {
+        stopTranscription();
         mediaRecorder.stop();
         isRecording = false;
         micBtnWrapper.classList.remove('recording');
@@ -345,13 +445,38 @@ function handleNavigation(location) {
 }
 
 function playAudioResponse(audioBase64) {
-    const audioBlob = base64ToBlob(audioBase64, 'audio/mp3');
-    const audioUrl = URL.createObjectURL(audioBlob);
+    resetAudioQueue();
+    enqueueAudioResponse(audioBase64);
+}
+
+function resetAudioQueue() {
+    audioQueue = [];
     if (audioPlayer) {
         audioPlayer.pause();
         audioPlayer.currentTime = 0;
+        audioPlayer = null;
+    }
+}
+
+function enqueueAudioResponse(audioBase64) {
+    audioQueue.push(audioBase64);
+    if (!audioPlayer) {
+        playNextAudio();
+    }
+}
+
+function playNextAudio() {
+    if (audioQueue.length === 0) {
+        audioPlayer = null;
+        return;
     }
+    const audioBlob = base64ToBlob(audioQueue.shift(), 'audio/mp3');
+    const audioUrl = URL.createObjectURL(audioBlob);
     audioPlayer = new Audio(audioUrl);
+    audioPlayer.onended = () => {
+        URL.revokeObjectURL(audioUrl);
+        playNextAudio();
+    };
     audioPlayer.play();
 }
 
@@ -380,6 +505,7 @@ window.addEventListener('DOMContentLoaded', () => {
 
 // Add a function to stop the Visionary app
 window.stopVisionaryApp = function() {
+    stopTranscription();
     if (audioStream) {
         audioStream.getTracks().forEach(track => track.stop());
         audioStream = null;
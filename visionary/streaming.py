@@ -0,0 +1,135 @@
+# visionary/streaming.py
+import json
+import re
+
+# A sentence ends at terminal punctuation followed by whitespace, at a CJK
+# full stop, or at a line break
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?।])\s+|(?<=[。！？])|\n+')
+
+# Very short fragments ("Yes.", "Dr.") are merged into the next sentence so
+# they do not each cost a TTS round trip
+MIN_SENTENCE_CHARS = 24
+
+# How much text to wait for before deciding there is no leading language line
+MAX_HEADER_CHARS = 40
+
+INTENT_PREFIXES = {
+    "navigation": "opening google maps for",
+    "search": "searching",
+}
+
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+class StreamedAnswer:
+    """Turns streamed Gemini text into speakable sentences.
+
+    The streaming prompt asks Gemini to put the language word first so
+    sentences can be synthesized while generation continues. If the model
+    does not, the whole answer is buffered and the trailing language word is
+    taken from the end, as in the non-streaming path.
+    """
+
+    def __init__(self, known_languages):
+        self.known_languages = set(known_languages)
+        self.language = None
+        self.intent = None
+        self.buffering = False
+        self.sentences = []
+        self._buffer = ""
+        self._pending = ""
+        self._header_done = False
+
+    def _language_word(self, text):
+        word = text.strip().strip('.,!?:;"\'').lower()
+        if word and len(text.split()) == 1 and word.isalpha():
+            return word
+        return None
+
+    def _read_header(self, final):
+        stripped = self._buffer.lstrip()
+        if "\n" not in stripped and len(stripped) < MAX_HEADER_CHARS and not final:
+            return False
+        first_line, newline, rest = stripped.partition("\n")
+        first_word, _, line_rest = first_line.strip().partition(" ")
+        word = self._language_word(first_word)
+        if word in self.known_languages:
+            self.language = word
+            self._buffer = (line_rest + newline + rest) if line_rest else rest
+        else:
+            # No language line: fall back to reading the language from the end
+            self.buffering = True
+        self._header_done = True
+        return True
+
+    def _read_intent(self, final):
+        body = self._buffer.lstrip().lower()
+        longest = max(len(prefix) for prefix in INTENT_PREFIXES.values())
+        if len(body) < longest and not final:
+            return False
+        self.intent = "answer"
+        for intent, prefix in INTENT_PREFIXES.items():
+            if body.startswith(prefix):
+                self.intent = intent
+                self.buffering = True
+        return True
+
+    def _take_sentences(self, final):
+        pieces = SENTENCE_BOUNDARY.split(self._buffer)
+        self._buffer = "" if final else pieces.pop()
+        ready = []
+        for piece in pieces:
+            piece = piece.strip()
+            if not piece or self._language_word(piece) in self.known_languages:
+                # Drop a language word the model appended despite the prompt
+                continue
+            self._pending = f"{self._pending} {piece}".strip()
+            if len(self._pending) >= MIN_SENTENCE_CHARS:
+                ready.append(self._pending)
+                self._pending = ""
+        if final and self._pending:
+            ready.append(self._pending)
+            self._pending = ""
+        self.sentences.extend(ready)
+        return ready
+
+    def feed(self, text, final=False):
+        # Returns the sentences that are ready to be spoken
+        self._buffer += text
+        if not self._header_done and not self._read_header(final):
+            return []
+        if not self.buffering and self.intent is None and not self._read_intent(final):
+            return []
+        if self.buffering:
+            return []
+        return self._take_sentences(final)
+
+    def finish(self):
+        ready = self.feed("", final=True)
+        if not self.buffering:
+            return ready
+        # Buffered answers keep the original trailing-language behaviour
+        text = self._buffer.strip()
+        self._buffer = ""
+        parts = text.rsplit(None, 1)
+        if len(parts) > 1:
+            trailing = self._language_word(parts[-1])
+            if self.language is None:
+                self.language = trailing or parts[-1].lower()
+                text = parts[0]
+            elif trailing in self.known_languages:
+                text = parts[0]
+        if self.language is None:
+            self.language = "english"
+        if self.intent is None:
+            self._buffer = text
+            self._read_intent(final=True)
+            self._buffer = ""
+        self.sentences = [text] if text else []
+        return []
+
+    @property
+    def text(self):
+        return " ".join(self.sentences)
@@ -0,0 +1,159 @@
+# visionary/tts_cache.py
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+
+# A sweep trims the disk tier to this share of its budget, so it is not rescanned on every write
+DISK_SWEEP_TARGET = 0.9
+
+
+class TTSCache:
+    """Two-tier cache of synthesized audio: an in-memory LRU bounded by bytes, backed by files on disk.
+
+    The disk tier has its own byte budget. Files are touched on every disk
+    hit, and when the budget is exceeded the least recently used ones (by
+    mtime) are removed.
+    """
+
+    def __init__(self, max_bytes, disk_dir=None, disk_max_bytes=None):
+        self.max_bytes = max_bytes
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.disk_max_bytes = disk_max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._disk_bytes = None  # unknown until the first sweep
+        self._lock = threading.Lock()
+        self._sweep_lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+        if self.disk_dir:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def make_key(text, language_code, voice_name, audio_config):
+        payload = json.dumps([text, language_code, voice_name, audio_config], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _disk_path(self, key):
+        return self.disk_dir / key[:2] / f"{key}.mp3"
+
+    def get_memory(self, keys):
+        # Returns the audio for the first key held in memory, without touching disk
+        with self._lock:
+            for key in keys:
+                audio = self._entries.get(key)
+                if audio is not None:
+                    self._entries.move_to_end(key)
+                    self.memory_hits += 1
+                    return audio
+        return None
+
+    def get_disk(self, keys):
+        # Blocking file reads; call from a worker thread
+        if self.disk_dir:
+            for key in keys:
+                path = self._disk_path(key)
+                try:
+                    audio = path.read_bytes()
+                    # Marks the file as recently used for disk eviction
+                    os.utime(path)
+                except FileNotFoundError:
+                    continue
+                with self._lock:
+                    self.disk_hits += 1
+                    self._store_memory(key, audio)
+                return audio
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, audio):
+        # Blocking file write; call from a worker thread
+        with self._lock:
+            self._store_memory(key, audio)
+        if not self.disk_dir:
+            return
+        if self.disk_max_bytes is not None and len(audio) > self.disk_max_bytes:
+            return
+        path = self._disk_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent)
+        with os.fdopen(fd, "wb") as tmp_file:
+            tmp_file.write(audio)
+        os.replace(tmp_path, path)
+        if self.disk_max_bytes is None:
+            return
+        with self._lock:
+            if self._disk_bytes is not None:
+                self._disk_bytes += len(audio)
+            over_budget = self._disk_bytes is None or self._disk_bytes > self.disk_max_bytes
+        if over_budget:
+            self.sweep_disk()
+
+    def sweep_disk(self):
+        # Blocking; removes the least recently used files until the disk tier
+        # is back under budget, including files left by a previous process or
+        # written by another worker
+        if not self.disk_dir:
+            return 0
+        with self._sweep_lock:
+            files = []
+            for path in self.disk_dir.glob("*/*.mp3"):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+            total = sum(size for _, size, _ in files)
+            removed = 0
+            if self.disk_max_bytes is not None and total > self.disk_max_bytes:
+                target = self.disk_max_bytes * DISK_SWEEP_TARGET
+                files.sort(key=lambda item: item[0])
+                for _, size, path in files:
+                    if total <= target:
+                        break
+                    path.unlink(missing_ok=True)
+                    total -= size
+                    removed += 1
+            with self._lock:
+                self._disk_bytes = total
+                self.disk_evictions += removed
+            return removed
+
+    def _store_memory(self, key, audio):
+        if len(audio) > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= len(previous)
+        self._entries[key] = audio
+        self._bytes += len(audio)
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+            self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "disk_bytes": self._disk_bytes,
+                "disk_max_bytes": self.disk_max_bytes,
+                "disk_evictions": self.disk_evictions,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            }
@@ -1,21 +1,31 @@
 import os
 import base64
-import io
-import time
-from collections import deque
 from pathlib import Path
+from urllib.parse import quote
 
-from fastapi import APIRouter, Request, File, UploadFile
+from fastapi import APIRouter, Request, File, Form, UploadFile
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
 from dotenv import load_dotenv
 import google.generativeai as genai
 from google.cloud import texttospeech_v1 as texttospeech
 from google.oauth2 import service_account
-import requests
-from pydub import AudioSegment
+import httpx
 import asyncio
 
+from common.lazy import Lazy
+from common.fakes import use_fake_providers
+from common.metrics import provider_call, span
+from common.shared_state import shared_state, shared_state_path
+from visionary.concurrency import provider_concurrency, provider_limit
+from visionary.tts_cache import TTSCache
+from visionary.voice_registry import VoiceRegistry, is_voice_error
+from visionary.streaming import StreamedAnswer, sse_event
+from visionary.mp3 import concat_mp3
+from visionary.frames import SceneCache, prepare_frame, question_key
+from visionary.rate_limit import RateLimitExceeded, create_limiter
+from visionary.search_cache import SearchCache
+
 # Get the root directory
 root_dir = Path(__file__).resolve().parent.parent
 
@@ -25,32 +35,153 @@ load_dotenv(dotenv_path=root_dir / '.env')
 visionary_router = APIRouter()
 visionary_templates = None
 
-# Configure Gemini
-GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
-if not GOOGLE_API_KEY:
-    raise ValueError("GOOGLE_API_KEY is not set in the environment variables.")
+# Providers are configured on first use, so importing this module is cheap
+# and a worker that never serves Visionary never pays for them
+def build_gemini_model():
+    if use_fake_providers():
+        from visionary.fakes import FakeGeminiModel
+        return FakeGeminiModel()
+    google_api_key = os.getenv("GOOGLE_API_KEY")
+    if not google_api_key:
+        raise ValueError("GOOGLE_API_KEY is not set in the environment variables.")
+    genai.configure(api_key=google_api_key)
+    return genai.GenerativeModel('models/gemini-1.5-flash')
+
+def load_credentials():
+    if use_fake_providers():
+        return None
+    credentials_path = root_dir / 'credentials' / 'google-cloud-credentials.json'
+    if not credentials_path.exists():
+        raise FileNotFoundError(f"Credentials file not found at {credentials_path}")
+    return service_account.Credentials.from_service_account_file(str(credentials_path))
+
+def load_perplexity_api_key():
+    if use_fake_providers():
+        return "fake"
+    perplexity_api_key = os.getenv("PERPLEXITY_API_KEY")
+    if not perplexity_api_key:
+        raise ValueError("PERPLEXITY_API_KEY is not set in the environment variables")
+    return perplexity_api_key
+
+model = Lazy("visionary.gemini_model", build_gemini_model)
+credentials = Lazy("visionary.tts_credentials", load_credentials)
+perplexity_api_key = Lazy("visionary.perplexity_api_key", load_perplexity_api_key)
+# The async TTS client binds its gRPC channel to the running event loop,
+# so it must first be requested from inside the loop
+def build_tts_client():
+    if use_fake_providers():
+        from visionary.fakes import FakeTTSClient
+        return FakeTTSClient()
+    return texttospeech.TextToSpeechAsyncClient(credentials=credentials.get())
+
+tts_client = Lazy("visionary.tts_client", build_tts_client)
+
+def get_tts_client():
+    return tts_client.get()
+
+# Keep-alive HTTP client shared by all Perplexity requests; the pool is sized
+# to the provider's concurrency limit so no call waits on a fresh TLS handshake
+PERPLEXITY_API_URL = os.getenv("PERPLEXITY_API_URL", "https://api.perplexity.ai/chat/completions")
+
+def build_http_client():
+    transport = None
+    if use_fake_providers():
+        from visionary.fakes import FakePerplexityTransport
+        transport = FakePerplexityTransport()
+    return httpx.AsyncClient(
+        timeout=10,
+        transport=transport,
+        limits=httpx.Limits(
+            max_connections=provider_concurrency("perplexity"),
+            max_keepalive_connections=provider_concurrency("perplexity"),
+            keepalive_expiry=60,
+        ),
+    )
+
+http_client = build_http_client()
+
+# Perplexity rate limit: a token bucket with a bounded wait queue, kept in the
+# shared state database so all workers draw from one bucket. VISIONARY_RATE_LIMIT_DB
+# overrides the file; with APP_SHARED_STATE=0 each worker has its own bucket.
+perplexity_limiter = create_limiter(
+    "perplexity",
+    rate_per_minute=float(os.getenv("VISIONARY_PERPLEXITY_RATE_PER_MINUTE", "20")),
+    burst=float(os.getenv("VISIONARY_PERPLEXITY_BURST", "5")),
+    max_waiters=int(os.getenv("VISIONARY_PERPLEXITY_MAX_WAITERS", "16")),
+    db_path=os.getenv("VISIONARY_RATE_LIMIT_DB") or shared_state_path(),
+)
 
-genai.configure(api_key=GOOGLE_API_KEY)
-model = genai.GenerativeModel('models/gemini-1.5-flash')
+# Search results by normalized query; identical concurrent queries share one
+# call, and results fetched by one worker are reused by the others
+search_cache = SearchCache(
+    ttl_seconds=float(os.getenv("VISIONARY_SEARCH_CACHE_TTL_SECONDS", "300")),
+    max_entries=int(os.getenv("VISIONARY_SEARCH_CACHE_SIZE", "2000")),
+    state=shared_state,
+)
 
-# Configure Text-to-Speech client
-credentials_path = root_dir / 'credentials' / 'google-cloud-credentials.json'
-if not credentials_path.exists():
-    raise FileNotFoundError(f"Credentials file not found at {credentials_path}")
+# Fixed phrases spoken by the server; these are pre-warmed in the TTS cache
+SEARCHING_MESSAGE = "Searching"
+ERROR_MESSAGE = "Sorry, there was an error processing your request. Please try again."
+SEARCH_NOT_FOUND_MESSAGE = "I'm sorry, I couldn't find that information."
+SEARCH_UNAVAILABLE_MESSAGE = "I'm sorry, but there was a problem connecting to my knowledge source. Please try again later."
+SEARCH_BUSY_MESSAGE = "I'm getting too many questions right now. Please ask again in a moment."
 
-credentials = service_account.Credentials.from_service_account_file(str(credentials_path))
-tts_client = texttospeech.TextToSpeechClient(credentials=credentials)
+# Synthesized audio cache: in-memory LRU with a byte budget, backed by files on
+# disk with their own byte budget (speech of user-derived answers is cached too)
+AUDIO_ENCODING = "MP3"
+prewarm_task = None
+tts_cache = TTSCache(
+    max_bytes=int(os.getenv("VISIONARY_TTS_CACHE_BYTES", str(64 * 1024 * 1024))),
+    disk_dir=os.getenv("VISIONARY_TTS_CACHE_DIR", str(root_dir / 'cache' / 'tts')),
+    disk_max_bytes=int(os.getenv("VISIONARY_TTS_DISK_BYTES", str(256 * 1024 * 1024))),
+)
 
-# Configure Perplexity API
-PERPLEXITY_API_KEY = os.getenv("PERPLEXITY_API_KEY")
-if not PERPLEXITY_API_KEY:
-    raise ValueError("PERPLEXITY_API_KEY is not set in the environment variables")
+# Camera frames are scaled down before upload, and recent answers are reused
+# when the same question is asked about a near-identical frame
+FRAME_MAX_SIDE = int(os.getenv("VISIONARY_FRAME_MAX_SIDE", "1024"))
+FRAME_JPEG_QUALITY = int(os.getenv("VISIONARY_FRAME_JPEG_QUALITY", "80"))
+scene_cache = SceneCache(
+    max_distance=int(os.getenv("VISIONARY_SCENE_MAX_DISTANCE", "6")),
+    ttl_seconds=float(os.getenv("VISIONARY_SCENE_CACHE_TTL_SECONDS", "30")),
+)
 
-# Rate limiting
-MAX_REQUESTS_PER_MINUTE = 20
-request_timestamps = deque(maxlen=MAX_REQUESTS_PER_MINUTE)
+# Working voice per language, with a cool-down for voices that fail
+voice_registry = VoiceRegistry(
+    cooldown_seconds=float(os.getenv("VISIONARY_VOICE_COOLDOWN_SECONDS", "300")),
+)
 
-DEFAULT_PROMPT = """
+# Map of language names to language codes and their Wavenet voices, in order of preference
+language_voices = {
+    'english': ('en-US', ['en-US-Wavenet-D', 'en-US-Wavenet-A', 'en-US-Wavenet-B', 'en-US-Wavenet-C']),
+    'hindi': ('hi-IN', ['hi-IN-Wavenet-D', 'hi-IN-Wavenet-A', 'hi-IN-Wavenet-B', 'hi-IN-Wavenet-C']),
+    'spanish': ('es-ES', ['es-ES-Wavenet-B', 'es-ES-Wavenet-A', 'es-ES-Wavenet-C', 'es-ES-Wavenet-D']),
+    'french': ('fr-FR', ['fr-FR-Wavenet-C', 'fr-FR-Wavenet-A', 'fr-FR-Wavenet-B', 'fr-FR-Wavenet-D']),
+    'german': ('de-DE', ['de-DE-Wavenet-F', 'de-DE-Wavenet-A', 'de-DE-Wavenet-B', 'de-DE-Wavenet-C']),
+    'kannada': ('kn-IN', ['kn-IN-Wavenet-A']),
+    'telugu': ('te-IN', ['te-IN-Wavenet-B', 'te-IN-Wavenet-A']),
+    'tamil': ('ta-IN', ['ta-IN-Wavenet-D', 'ta-IN-Wavenet-A', 'ta-IN-Wavenet-B', 'ta-IN-Wavenet-C']),
+    'malayalam': ('ml-IN', ['ml-IN-Wavenet-D', 'ml-IN-Wavenet-A', 'ml-IN-Wavenet-B', 'ml-IN-Wavenet-C']),
+    'bengali': ('bn-IN', ['bn-IN-Wavenet-A']),
+    'gujarati': ('gu-IN', ['gu-IN-Wavenet-A']),
+    'marathi': ('mr-IN', ['mr-IN-Wavenet-A']),
+    'japanese': ('ja-JP', ['ja-JP-Wavenet-D', 'ja-JP-Wavenet-A', 'ja-JP-Wavenet-B', 'ja-JP-Wavenet-C']),
+    'korean': ('ko-KR', ['ko-KR-Wavenet-D', 'ko-KR-Wavenet-A', 'ko-KR-Wavenet-B', 'ko-KR-Wavenet-C']),
+    'chinese': ('cmn-CN', ['cmn-CN-Wavenet-D', 'cmn-CN-Wavenet-A', 'cmn-CN-Wavenet-B', 'cmn-CN-Wavenet-C']),
+    'arabic': ('ar-XA', ['ar-XA-Wavenet-B', 'ar-XA-Wavenet-A', 'ar-XA-Wavenet-C', 'ar-XA-Wavenet-D']),
+    'russian': ('ru-RU', ['ru-RU-Wavenet-D', 'ru-RU-Wavenet-A', 'ru-RU-Wavenet-B', 'ru-RU-Wavenet-C']),
+    'portuguese': ('pt-BR', ['pt-BR-Wavenet-B', 'pt-BR-Wavenet-A', 'pt-BR-Wavenet-C', 'pt-BR-Wavenet-D']),
+    'italian': ('it-IT', ['it-IT-Wavenet-D', 'it-IT-Wavenet-A', 'it-IT-Wavenet-B', 'it-IT-Wavenet-C']),
+    'dutch': ('nl-NL', ['nl-NL-Wavenet-E', 'nl-NL-Wavenet-A', 'nl-NL-Wavenet-B', 'nl-NL-Wavenet-C']),
+    'polish': ('pl-PL', ['pl-PL-Wavenet-E', 'pl-PL-Wavenet-A', 'pl-PL-Wavenet-B', 'pl-PL-Wavenet-C']),
+    'swedish': ('sv-SE', ['sv-SE-Wavenet-A', 'sv-SE-Wavenet-B', 'sv-SE-Wavenet-C']),
+    'turkish': ('tr-TR', ['tr-TR-Wavenet-E', 'tr-TR-Wavenet-A', 'tr-TR-Wavenet-B', 'tr-TR-Wavenet-C']),
+    'vietnamese': ('vi-VN', ['vi-VN-Wavenet-D', 'vi-VN-Wavenet-A', 'vi-VN-Wavenet-B', 'vi-VN-Wavenet-C']),
+    'indonesian': ('id-ID', ['id-ID-Wavenet-D', 'id-ID-Wavenet-A', 'id-ID-Wavenet-B', 'id-ID-Wavenet-C']),
+    'thai': ('th-TH', ['th-TH-Wavenet-C', 'th-TH-Wavenet-A', 'th-TH-Wavenet-B']),
+    'punjabi': ('pa-IN', ['pa-IN-Wavenet-A', 'pa-IN-Wavenet-B', 'pa-IN-Wavenet-C', 'pa-IN-Wavenet-D']),
+}
+
+PROMPT_RULES = """
 Please respond to my audio questions by only following these specific rules:
 
 1. If I ask questions in any language that is similar to:-  "What is in front of me?", "Can I cross the road?", or "What is this object?", then only analyze the given image and provide a concise description in the same language I used. Since I am blind, include relevant safety concerns. 
@@ -67,34 +198,86 @@ Please respond to my audio questions by only following these specific rules:
      - Response: "Searching who won the match between India and Australia?"
 
 4. For general queries not covered above (e.g., recipes, guides, casual greetings), reply in the same language as the question without using any symbols or emojis and never repeat the question.
+"""
 
+DEFAULT_PROMPT = PROMPT_RULES + """
 5. End each response by specifying the language used by the user as a single word.
    - Example: "English", "Hindi", "Spanish", etc.
 """
 
+# The streaming endpoint needs the language before the first sentence is spoken
+STREAMING_PROMPT = PROMPT_RULES + """
+5. Start each response with the language used by the user as a single word on its own line, then give the response.
+   - Example: "English", "Hindi", "Spanish", etc.
+"""
+
 @visionary_router.get("/", response_class=HTMLResponse)
 async def visionary_home(request: Request):
     return visionary_templates.TemplateResponse("visionary.html", {"request": request})
 
+def wants_binary_audio(request):
+    # Clients that send "Accept: audio/mpeg" get the MP3 as the response body,
+    # with the text fields in headers, instead of base64 inside JSON
+    return "audio/mpeg" in request.headers.get("accept", "")
+
+def audio_response(request, payload, audio_content, status_code=200):
+    if wants_binary_audio(request):
+        headers = {
+            f"X-{key.replace('_', '-').title()}": quote(str(value))
+            for key, value in payload.items()
+        }
+        return Response(content=audio_content, media_type="audio/mpeg", headers=headers, status_code=status_code)
+    payload["audio"] = base64.b64encode(audio_content).decode('utf-8')
+    return JSONResponse(content=payload, status_code=status_code)
+
+async def read_media(audio, image, question, mode):
+    # Returns the Gemini media parts and the scene cache key for this request.
+    # The key is None when the frame could not be decoded and is sent as is.
+    audio_content = await audio.read()
+    image_content = await image.read()
+    image_mime = image.content_type
+    original_size = len(image_content)
+    frame_hash = None
+    try:
+        with span("frame_prepare"):
+            prepared, frame_hash = await asyncio.to_thread(prepare_frame, image_content, FRAME_MAX_SIDE, FRAME_JPEG_QUALITY)
+        if prepared is not image_content:
+            image_content, image_mime = prepared, "image/jpeg"
+    except Exception as e:
+        print(f"Error preparing frame: {str(e)}")
+    scene_cache.record_frame(original_size, len(image_content))
+
+    media_parts = [
+        {"mime_type": audio.content_type, "data": audio_content},
+        {"mime_type": image_mime, "data": image_content},
+    ]
+    # Answers from the two prompts are formatted differently, so they are cached apart
+    scene_key = (f"{mode}:{question_key(question, audio_content)}", frame_hash) if frame_hash is not None else None
+    return media_parts, scene_key
+
 @visionary_router.post("/process_audio_and_image")
-async def process_audio_and_image(audio: UploadFile = File(...), image: UploadFile = File(...)):
+async def process_audio_and_image(
+    request: Request,
+    audio: UploadFile = File(...),
+    image: UploadFile = File(...),
+    question: str | None = Form(None),
+):
     try:
-        # Process audio and image
-        audio_content = await audio.read()
-        audio_base64 = base64.b64encode(audio_content).decode('utf-8')
-        
-        image_content = await image.read()
-        image_base64 = base64.b64encode(image_content).decode('utf-8')
-        
-        # Send both audio and image to Gemini
-        response = model.generate_content([
-            DEFAULT_PROMPT,
-            "Process this audio input and image:",
-            {"mime_type": audio.content_type, "data": audio_base64},
-            {"mime_type": image.content_type, "data": image_base64}
-        ])
-        
-        text_response = response.text if response.text else "I'm sorry, I couldn't process the input."
+        media_parts, scene_key = await read_media(audio, image, question, "answer")
+
+        text_response = scene_cache.lookup(*scene_key) if scene_key else None
+        if text_response is None:
+            # Send both audio and image to Gemini
+            async with provider_limit("gemini"):
+                with provider_call("gemini"):
+                    response = await model.get().generate_content_async([
+                        DEFAULT_PROMPT,
+                        "Process this audio input and image:",
+                        *media_parts
+                    ])
+            text_response = response.text if response.text else "I'm sorry, I couldn't process the input."
+            if scene_key and response.text:
+                scene_cache.store(*scene_key, text_response)
         print(f"Gemini response: {text_response}")
         
         # Extract language from the response
@@ -105,66 +288,162 @@ async def process_audio_and_image(audio: UploadFile = File(...), image: UploadFi
         if text_response.lower().startswith("opening google maps for"):
             print("Triggering navigation")
             location = text_response.replace("Opening Google Maps for", "").strip()
-            audio_content = synthesize_speech(text_response, language)
-            return JSONResponse(content={
+            audio_content = await synthesize_audio(text_response, language)
+            return audio_response(request, {
                 "response": text_response, 
-                "audio": audio_content, 
                 "is_navigation": True, 
                 "location": location
-            })
+            }, audio_content)
         elif text_response.lower().startswith("searching"):
             print("Handling recent information query")
             search_query = text_response[len("searching"):].strip()
             
-            searching_audio = synthesize_speech("Searching", language)
             print(f"Sending query to Perplexity API: {search_query}")
-            search_result = await search_perplexity(search_query)
+            searching_audio, search_result = await asyncio.gather(
+                synthesize_audio(SEARCHING_MESSAGE, language),
+                search_perplexity(search_query),
+            )
             print(f"Received result from Perplexity API: {search_result}")
-            result_audio = synthesize_speech(search_result, language)
-            combined_audio = combine_audio(searching_audio, result_audio)
+            result_audio = await synthesize_audio(search_result, language)
+            # Join at the MP3 frame level, without transcoding
+            with span("mp3_concat"):
+                combined_audio = concat_mp3(searching_audio, result_audio)
             
-            return JSONResponse(content={
+            return audio_response(request, {
                 "response": f"Searching. {search_result}",
-                "audio": combined_audio,
                 "is_searching": True
-            })
+            }, combined_audio)
         else:
             print("Regular response")
-            audio_content = synthesize_speech(text_response, language)
-            return JSONResponse(content={
-                "response": text_response, 
-                "audio": audio_content
-            })
+            audio_content = await synthesize_audio(text_response, language)
+            return audio_response(request, {
+                "response": text_response
+            }, audio_content)
     except Exception as e:
         print(f"Error processing input: {str(e)}")
-        error_message = "Sorry, there was an error processing your request. Please try again."
-        error_audio = synthesize_speech(error_message, "english")
-        return JSONResponse(content={
+        error_message = ERROR_MESSAGE
+        error_audio = await synthesize_audio(error_message, "english")
+        return audio_response(request, {
             "error": str(e), 
-            "response": error_message, 
-            "audio": error_audio
-        }, status_code=500)
+            "response": error_message
+        }, error_audio, status_code=500)
+
+@visionary_router.post("/process_audio_and_image/stream")
+async def process_audio_and_image_stream(
+    audio: UploadFile = File(...),
+    image: UploadFile = File(...),
+    question: str | None = Form(None),
+):
+    media_parts, scene_key = await read_media(audio, image, question, "stream")
+    return StreamingResponse(
+        stream_answer_events(media_parts, scene_key),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+async def stream_answer_events(media_parts, scene_key=None):
+    # Sentences are synthesized concurrently while Gemini is still generating,
+    # and sent to the client in order as soon as each one is ready
+    events = asyncio.Queue()
+    audio_tasks = []
+    producer = asyncio.create_task(produce_streamed_answer(media_parts, events, audio_tasks, scene_key))
+    try:
+        while True:
+            item = await events.get()
+            if item is None:
+                break
+            event, payload = item
+            if isinstance(payload.get("audio"), asyncio.Task):
+                payload["audio"] = await payload["audio"]
+            yield sse_event(event, payload)
+        await producer
+    except Exception as e:
+        print(f"Error streaming response: {str(e)}")
+        error_audio = await synthesize_speech(ERROR_MESSAGE, "english")
+        yield sse_event("error", {"error": str(e), "response": ERROR_MESSAGE, "audio": error_audio})
+    finally:
+        # Stop generation and synthesis if the client went away
+        producer.cancel()
+        for task in audio_tasks:
+            task.cancel()
+
+async def produce_streamed_answer(media_parts, events, audio_tasks, scene_key=None):
+    answer = StreamedAnswer(language_voices)
+    index = 0
+
+    async def emit_sentences(sentences):
+        nonlocal index
+        for sentence in sentences:
+            task = asyncio.create_task(synthesize_speech(sentence, answer.language))
+            audio_tasks.append(task)
+            await events.put(("audio", {"index": index, "text": sentence, "audio": task}))
+            index += 1
+
+    try:
+        cached_text = scene_cache.lookup(*scene_key) if scene_key else None
+        if cached_text is not None:
+            await emit_sentences(answer.feed(cached_text))
+        else:
+            raw_text = []
+            async with provider_limit("gemini"):
+                with provider_call("gemini"):
+                    response = await model.get().generate_content_async([
+                        STREAMING_PROMPT,
+                        "Process this audio input and image:",
+                        *media_parts
+                    ], stream=True)
+                    async for chunk in response:
+                        raw_text.append(chunk.text)
+                        await emit_sentences(answer.feed(chunk.text))
+            if scene_key and raw_text:
+                scene_cache.store(*scene_key, "".join(raw_text))
+        await emit_sentences(answer.finish())
+        print(f"Gemini streamed response ({answer.language}, {answer.intent}): {answer.text}")
+
+        text_response = answer.text or "I'm sorry, I couldn't process the input."
+        if answer.intent == "navigation":
+            location = text_response.replace("Opening Google Maps for", "").strip()
+            audio_content = await synthesize_speech(text_response, answer.language)
+            await events.put(("audio", {"index": 0, "text": text_response, "audio": audio_content}))
+            await events.put(("navigation", {"location": location}))
+        elif answer.intent == "search":
+            # Acknowledge right away, then send the result as a second clip
+            search_query = text_response[len("searching"):].strip()
+            search_task = asyncio.create_task(search_perplexity(search_query))
+            audio_tasks.append(search_task)
+            searching_audio = await synthesize_speech(SEARCHING_MESSAGE, answer.language)
+            await events.put(("audio", {"index": 0, "text": SEARCHING_MESSAGE, "audio": searching_audio, "is_searching": True}))
+            search_result = await search_task
+            result_audio = await synthesize_speech(search_result, answer.language)
+            await events.put(("audio", {"index": 1, "text": search_result, "audio": result_audio, "is_searching": True}))
+            text_response = f"Searching. {search_result}"
+        elif answer.buffering or not answer.sentences:
+            audio_content = await synthesize_speech(text_response, answer.language)
+            await events.put(("audio", {"index": 0, "text": text_response, "audio": audio_content}))
+
+        await events.put(("done", {"response": text_response, "language": answer.language}))
+    finally:
+        await events.put(None)
 
 async def search_perplexity(query: str):
-    global request_timestamps
-    current_time = time.time()
-    
-    # Remove timestamps older than 1 minute
-    while request_timestamps and current_time - request_timestamps[0] > 60:
-        request_timestamps.popleft()
-    
-    # If we've made 20 requests in the last minute, wait
-    if len(request_timestamps) >= MAX_REQUESTS_PER_MINUTE:
-        wait_time = 60 - (current_time - request_timestamps[0])
-        if wait_time > 0:
-            await asyncio.sleep(wait_time)
-    
-    # Add current timestamp to the queue
-    request_timestamps.append(time.time())
+    # Cache hits and shared in-flight calls use no rate-limit tokens
+    with span("search"):
+        return await search_cache.get_or_fetch(
+            query,
+            fetch_perplexity,
+            cacheable=lambda answer: answer not in (SEARCH_NOT_FOUND_MESSAGE, SEARCH_UNAVAILABLE_MESSAGE, SEARCH_BUSY_MESSAGE),
+        )
+
+async def fetch_perplexity(query: str):
+    try:
+        with span("rate_limit_wait"):
+            await perplexity_limiter.acquire()
+    except RateLimitExceeded as e:
+        print(f"Perplexity rate limit: {str(e)}")
+        return SEARCH_BUSY_MESSAGE
 
-    url = "https://api.perplexity.ai/chat/completions"
     headers = {
-        "Authorization": f"Bearer {PERPLEXITY_API_KEY}",
+        "Authorization": f"Bearer {perplexity_api_key.get()}",
         "Content-Type": "application/json"
     }
     data = {
@@ -177,111 +456,150 @@ async def search_perplexity(query: str):
     }
     
     try:
-        response = requests.post(url, json=data, headers=headers, timeout=10)
-        response.raise_for_status()
+        async with provider_limit("perplexity"):
+            with provider_call("perplexity"):
+                response = await http_client.post(PERPLEXITY_API_URL, json=data, headers=headers)
+                response.raise_for_status()
         result = response.json()
         
         if 'choices' in result and len(result['choices']) > 0:
             answer = result['choices'][0]['message']['content']
             return answer.strip()
         else:
-            return "I'm sorry, I couldn't find that information."
+            return SEARCH_NOT_FOUND_MESSAGE
     except Exception as e:
         print(f"Error querying Perplexity API: {str(e)}")
-        return "I'm sorry, but there was a problem connecting to my knowledge source. Please try again later."
-
-def combine_audio(audio1, audio2):
-    # Decode base64 strings to bytes
-    audio1_bytes = base64.b64decode(audio1)
-    audio2_bytes = base64.b64decode(audio2)
+        return SEARCH_UNAVAILABLE_MESSAGE
 
-    # Create AudioSegment objects from the bytes
-    sound1 = AudioSegment.from_mp3(io.BytesIO(audio1_bytes))
-    sound2 = AudioSegment.from_mp3(io.BytesIO(audio2_bytes))
+async def synthesize_speech(text, language):
+    # Base64 form for JSON and event-stream payloads
+    audio_content = await synthesize_audio(text, language)
+    return base64.b64encode(audio_content).decode('utf-8')
 
-    # Concatenate the two audio segments
-    combined = sound1 + sound2
+async def synthesize_audio(text, language):
+    # Default to English if language not supported
+    language_code, voice_names = language_voices.get(language, ('en-US', ['en-US-Wavenet-D']))
+    candidates = voice_registry.candidates(language_code, voice_names)
 
-    # Export the combined audio to a bytes buffer
-    buffer = io.BytesIO()
-    combined.export(buffer, format="mp3")
-    buffer.seek(0)
+    # Serve from cache if any candidate voice already produced this phrase
+    cache_keys = [
+        TTSCache.make_key(text, language_code, voice_name, AUDIO_ENCODING)
+        for voice_name in candidates
+    ]
+    with span("tts_cache"):
+        audio_content = tts_cache.get_memory(cache_keys)
+        if audio_content is None:
+            audio_content = await asyncio.to_thread(tts_cache.get_disk, cache_keys)
+    if audio_content is not None:
+        return audio_content
 
-    # Encode the combined audio back to base64
-    combined_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
+    # Known-good voice first, then the remaining Wavenet voices, then the Standard fallback.
+    # The span covers every attempt, so time lost to voice fallback shows up here.
+    input_text = texttospeech.SynthesisInput(text=text)
+    last_error = None
+    with span("tts_synthesis"):
+        for voice_name in candidates:
+            try:
+                audio_content = await synthesize_with_voice(input_text, language_code, voice_name)
+                voice_registry.record_success(language_code, voice_name)
+                break
+            except Exception as e:
+                print(f"Error with voice {voice_name} for {language_code}: {str(e)}")
+                # Anything but a bad voice fails the same way for every voice
+                if not is_voice_error(e):
+                    raise
+                voice_registry.record_failure(language_code, voice_name)
+                last_error = e
+        else:
+            raise last_error
 
-    return combined_base64
+    cache_key = TTSCache.make_key(text, language_code, voice_name, AUDIO_ENCODING)
+    await asyncio.to_thread(tts_cache.put, cache_key, audio_content)
+    return audio_content
 
-def synthesize_speech(text, language):
-    input_text = texttospeech.SynthesisInput(text=text)
-    
-    # Map of language codes to appropriate Wavenet voices
-    language_voices = {
-        'english': ('en-US', ['en-US-Wavenet-D', 'en-US-Wavenet-A', 'en-US-Wavenet-B', 'en-US-Wavenet-C']),
-        'hindi': ('hi-IN', ['hi-IN-Wavenet-D', 'hi-IN-Wavenet-A', 'hi-IN-Wavenet-B', 'hi-IN-Wavenet-C']),
-        'spanish': ('es-ES', ['es-ES-Wavenet-B', 'es-ES-Wavenet-A', 'es-ES-Wavenet-C', 'es-ES-Wavenet-D']),
-        'french': ('fr-FR', ['fr-FR-Wavenet-C', 'fr-FR-Wavenet-A', 'fr-FR-Wavenet-B', 'fr-FR-Wavenet-D']),
-        'german': ('de-DE', ['de-DE-Wavenet-F', 'de-DE-Wavenet-A', 'de-DE-Wavenet-B', 'de-DE-Wavenet-C']),
-        'kannada': ('kn-IN', ['kn-IN-Wavenet-A']),
-        'telugu': ('te-IN', ['te-IN-Wavenet-B', 'te-IN-Wavenet-A']),
-        'tamil': ('ta-IN', ['ta-IN-Wavenet-D', 'ta-IN-Wavenet-A', 'ta-IN-Wavenet-B', 'ta-IN-Wavenet-C']),
-        'malayalam': ('ml-IN', ['ml-IN-Wavenet-D', 'ml-IN-Wavenet-A', 'ml-IN-Wavenet-B', 'ml-IN-Wavenet-C']),
-        'bengali': ('bn-IN', ['bn-IN-Wavenet-A']),
-        'gujarati': ('gu-IN', ['gu-IN-Wavenet-A']),
-        'marathi': ('mr-IN', ['mr-IN-Wavenet-A']),
-        'japanese': ('ja-JP', ['ja-JP-Wavenet-D', 'ja-JP-Wavenet-A', 'ja-JP-Wavenet-B', 'ja-JP-Wavenet-C']),
-        'korean': ('ko-KR', ['ko-KR-Wavenet-D', 'ko-KR-Wavenet-A', 'ko-KR-Wavenet-B', 'ko-KR-Wavenet-C']),
-        'chinese': ('cmn-CN', ['cmn-CN-Wavenet-D', 'cmn-CN-Wavenet-A', 'cmn-CN-Wavenet-B', 'cmn-CN-Wavenet-C']),
-        'arabic': ('ar-XA', ['ar-XA-Wavenet-B', 'ar-XA-Wavenet-A', 'ar-XA-Wavenet-C', 'ar-XA-Wavenet-D']),
-        'russian': ('ru-RU', ['ru-RU-Wavenet-D', 'ru-RU-Wavenet-A', 'ru-RU-Wavenet-B', 'ru-RU-Wavenet-C']),
-        'portuguese': ('pt-BR', ['pt-BR-Wavenet-B', 'pt-BR-Wavenet-A', 'pt-BR-Wavenet-C', 'pt-BR-Wavenet-D']),
-        'italian': ('it-IT', ['it-IT-Wavenet-D', 'it-IT-Wavenet-A', 'it-IT-Wavenet-B', 'it-IT-Wavenet-C']),
-        'dutch': ('nl-NL', ['nl-NL-Wavenet-E', 'nl-NL-Wavenet-A', 'nl-NL-Wavenet-B', 'nl-NL-Wavenet-C']),
-        'polish': ('pl-PL', ['pl-PL-Wavenet-E', 'pl-PL-Wavenet-A', 'pl-PL-Wavenet-B', 'pl-PL-Wavenet-C']),
-        'swedish': ('sv-SE', ['sv-SE-Wavenet-A', 'sv-SE-Wavenet-B', 'sv-SE-Wavenet-C']),
-        'turkish': ('tr-TR', ['tr-TR-Wavenet-E', 'tr-TR-Wavenet-A', 'tr-TR-Wavenet-B', 'tr-TR-Wavenet-C']),
-        'vietnamese': ('vi-VN', ['vi-VN-Wavenet-D', 'vi-VN-Wavenet-A', 'vi-VN-Wavenet-B', 'vi-VN-Wavenet-C']),
-        'indonesian': ('id-ID', ['id-ID-Wavenet-D', 'id-ID-Wavenet-A', 'id-ID-Wavenet-B', 'id-ID-Wavenet-C']),
-        'thai': ('th-TH', ['th-TH-Wavenet-C', 'th-TH-Wavenet-A', 'th-TH-Wavenet-B']),
-        'punjabi': ('pa-IN', ['pa-IN-Wavenet-A', 'pa-IN-Wavenet-B', 'pa-IN-Wavenet-C', 'pa-IN-Wavenet-D']),
-    }
-    
-    # Default to English if language not supported
-    language_code, voice_names = language_voices.get(language, ('en-US', ['en-US-Wavenet-D']))
-    
-    for voice_name in voice_names:
-        try:
-            voice = texttospeech.VoiceSelectionParams(
-                language_code=language_code,
-                name=voice_name
-            )
-            
-            audio_config = texttospeech.AudioConfig(
-                audio_encoding=texttospeech.AudioEncoding.MP3
-            )
-            
-            response = tts_client.synthesize_speech(
-                input=input_text, voice=voice, audio_config=audio_config
-            )
-            return base64.b64encode(response.audio_content).decode('utf-8')
-        except Exception as e:
-            print(f"Error with Wavenet voice {voice_name} for {language_code}: {str(e)}")
-    
-    # Fallback to Standard voice if no Wavenet voice is available
+async def synthesize_with_voice(input_text, language_code, voice_name):
     voice = texttospeech.VoiceSelectionParams(
         language_code=language_code,
-        name=f"{language_code}-Standard-A"
+        name=voice_name
     )
     
     audio_config = texttospeech.AudioConfig(
-        audio_encoding=texttospeech.AudioEncoding.MP3
-    )
-    
-    response = tts_client.synthesize_speech(
-        input=input_text, voice=voice, audio_config=audio_config
+        audio_encoding=texttospeech.AudioEncoding[AUDIO_ENCODING]
     )
     
-    return base64.b64encode(response.audio_content).decode('utf-8')
+    async with provider_limit("tts"):
+        with provider_call("tts"):
+            response = await get_tts_client().synthesize_speech(
+                input=input_text, voice=voice, audio_config=audio_config
+            )
+    return response.audio_content
+
+async def resolve_voices():
+    # Ask the provider which voices exist so bad voices are never tried per request
+    try:
+        async with provider_limit("tts"):
+            response = await get_tts_client().list_voices()
+        voice_registry.load_available([voice.name for voice in response.voices], language_voices)
+        print(f"Resolved TTS voices: {voice_registry.stats()['resolved']}")
+    except Exception as e:
+        # Voices are then resolved lazily on first success
+        print(f"Error listing TTS voices: {str(e)}")
+
+async def prewarm_tts_cache():
+    # Synthesize the fixed phrases once per language so later requests hit the cache.
+    # The error message is only ever spoken in English.
+    phrases = [SEARCHING_MESSAGE, SEARCH_NOT_FOUND_MESSAGE, SEARCH_UNAVAILABLE_MESSAGE, SEARCH_BUSY_MESSAGE]
+    jobs = [synthesize_audio(phrase, language) for language in language_voices for phrase in phrases]
+    jobs.append(synthesize_audio(ERROR_MESSAGE, "english"))
+    results = await asyncio.gather(*jobs, return_exceptions=True)
+    failures = sum(1 for result in results if isinstance(result, Exception))
+    print(f"TTS cache pre-warm finished: {len(results) - failures} phrases ready, {failures} failed")
+
+@visionary_router.on_event("startup")
+async def start_tts_warmup():
+    global prewarm_task
+    # Runs in the background so startup is not held up by TTS round trips
+    prewarm_task = asyncio.create_task(warm_up_tts())
+
+async def warm_up_tts():
+    # Trims files left over from earlier runs to the disk budget
+    removed = await asyncio.to_thread(tts_cache.sweep_disk)
+    if removed:
+        print(f"TTS cache sweep removed {removed} files")
+    if os.getenv("VISIONARY_TTS_PREWARM", "1") == "1":
+        await resolve_voices()
+        await prewarm_tts_cache()
+
+async def warm_up():
+    # Explicit warm-up hook: build every provider client now instead of on the first request
+    await asyncio.to_thread(model.get)
+    await asyncio.to_thread(credentials.get)
+    await asyncio.to_thread(perplexity_api_key.get)
+    get_tts_client()
+
+@visionary_router.get("/tts_cache/stats")
+async def tts_cache_stats():
+    return JSONResponse(content=tts_cache.stats())
+
+@visionary_router.get("/scene_cache/stats")
+async def scene_cache_stats():
+    return JSONResponse(content=scene_cache.stats())
+
+@visionary_router.get("/search_cache/stats")
+async def search_cache_stats():
+    return JSONResponse(content=search_cache.stats())
+
+@visionary_router.get("/rate_limit/stats")
+async def rate_limit_stats():
+    return JSONResponse(content=perplexity_limiter.stats())
+
+@visionary_router.get("/voices")
+async def voice_registry_stats():
+    return JSONResponse(content=voice_registry.stats())
+
+@visionary_router.on_event("shutdown")
+async def close_http_client():
+    await http_client.aclose()
 
 def set_templates(templates):
     global visionary_templates
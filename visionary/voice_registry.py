@@ -0,0 +1,99 @@
+# visionary/voice_registry.py
+import threading
+import time
+
+# Provider messages for a voice that does not exist or cannot speak the request;
+# Google reports these as INVALID_ARGUMENT or NOT_FOUND
+VOICE_ERROR_MARKERS = ("does not exist", "not found", "not supported", "unsupported", "not available")
+
+
+def is_voice_error(error):
+    # Only these say something about the voice. Other errors (text too long,
+    # quota, provider unavailable) would fail for every voice, so they must
+    # not open the voice's circuit.
+    message = str(error).lower()
+    return "voice" in message and any(marker in message for marker in VOICE_ERROR_MARKERS)
+
+
+class VoiceRegistry:
+    """Remembers which TTS voice works for each language and which voices are failing."""
+
+    def __init__(self, cooldown_seconds=300, failure_threshold=1):
+        self.cooldown_seconds = cooldown_seconds
+        self.failure_threshold = failure_threshold
+        self._resolved = {}        # language_code -> known-good voice name
+        self._failures = {}        # voice name -> consecutive failure count
+        self._open_until = {}      # voice name -> time until which the voice is skipped
+        self._available = None     # voice names reported by the provider, if known
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def fallback_voice(language_code):
+        return f"{language_code}-Standard-A"
+
+    def load_available(self, voice_names, language_voices):
+        # Resolve the working voice per language up front from the provider's voice list
+        available = set(voice_names)
+        with self._lock:
+            self._available = available
+            for language_code, preferred in language_voices.values():
+                if language_code in self._resolved:
+                    continue
+                for voice_name in preferred:
+                    if voice_name in available:
+                        self._resolved[language_code] = voice_name
+                        break
+
+    def candidates(self, language_code, voice_names):
+        # Known-good voice first, then the preference list minus open circuits,
+        # and the Standard voice last so there is always something to try
+        now = time.monotonic()
+        fallback = self.fallback_voice(language_code)
+        with self._lock:
+            ordered = []
+            resolved = self._resolved.get(language_code)
+            if resolved and self._is_usable(resolved, now):
+                ordered.append(resolved)
+            for voice_name in voice_names:
+                if voice_name not in ordered and self._is_usable(voice_name, now):
+                    ordered.append(voice_name)
+        if fallback not in ordered:
+            ordered.append(fallback)
+        return ordered
+
+    def _is_usable(self, voice_name, now):
+        if self._available is not None and voice_name not in self._available:
+            return False
+        return self._open_until.get(voice_name, 0) <= now
+
+    def record_success(self, language_code, voice_name):
+        with self._lock:
+            self._failures.pop(voice_name, None)
+            self._open_until.pop(voice_name, None)
+            # The Standard fallback is never pinned, so preferred voices are
+            # retried once their cool-down expires
+            if voice_name != self.fallback_voice(language_code):
+                self._resolved[language_code] = voice_name
+
+    def record_failure(self, language_code, voice_name):
+        with self._lock:
+            failures = self._failures.get(voice_name, 0) + 1
+            self._failures[voice_name] = failures
+            if failures >= self.failure_threshold:
+                # Open the circuit; the voice is retried once the cool-down has passed
+                self._open_until[voice_name] = time.monotonic() + self.cooldown_seconds
+            if self._resolved.get(language_code) == voice_name:
+                del self._resolved[language_code]
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "resolved": dict(self._resolved),
+                "open_circuits": {
+                    voice_name: round(open_until - now, 1)
+                    for voice_name, open_until in self._open_until.items()
+                    if open_until > now
+                },
+                "provider_voices_loaded": self._available is not None,
+            }